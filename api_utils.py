@@ -0,0 +1,110 @@
+import base64
+import json
+from datetime import date, datetime
+
+# Fields exposed by the JSON API, in the order they are serialized
+ITEM_FIELDS = [
+    'id', 'name', 'item_type', 'purchase_date',
+    'seller_id', 'seller_name', 'seller_nic', 'seller_contact', 'seller_location',
+    'buyer_id', 'buyer_name', 'buyer_nic', 'buyer_contact', 'buyer_location',
+    'specifications', 'imei', 'serial_number', 'item_price', 'transport_cost', 'food_cost',
+    'fuel_cost', 'other_expenses', 'images', 'agreement_image',
+    'created_at', 'updated_at', 'selling_date', 'selling_price', 'selling_expenses',
+    'gross_profit', 'net_profit', 'sold'
+]
+
+# Columns that hold JSON text and are decoded before serializing
+JSON_FIELDS = ('specifications', 'images', 'agreement_image')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_fields(value):
+    """Parse a sparse fieldset (fields=a,b,c) into a list of field names.
+
+    Returns None when all fields are requested. The id is always included
+    so clients can key their local copy.
+    """
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in ITEM_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields
+
+
+def serialize_item(item, fields=None):
+    """Serialize an Item to a JSON-compatible dict."""
+    data = {}
+    for field in fields or ITEM_FIELDS:
+        if field == 'sold':
+            data['sold'] = item.selling_price is not None
+            continue
+        value = getattr(item, field)
+        if field in JSON_FIELDS:
+            try:
+                value = json.loads(value) if value else None
+            except ValueError:
+                pass  # Legacy plain-text value
+        elif hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        data[field] = value
+    return data
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD query parameter, returning None when empty."""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def parse_datetime(value):
+    """Parse an ISO 8601 timestamp query parameter, returning None when empty."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+
+def parse_bool(value):
+    """Parse a true/false query parameter, returning None when empty."""
+    if value is None or value == '':
+        return None
+    value = value.lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"Invalid boolean value: {value}")
+
+
+def parse_limit(value):
+    """Parse the page size, clamped to MAX_PAGE_SIZE."""
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def encode_cursor(item):
+    """Encode the sort key of the last item on a page as an opaque cursor."""
+    key = [item.purchase_date.isoformat(), item.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor into (purchase_date, id)."""
+    try:
+        purchase_date, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return date.fromisoformat(purchase_date), int(item_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
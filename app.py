@@ -1,18 +1,52 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, jsonify, g, abort
+from markupsafe import Markup
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from datetime import datetime
+from flask_migrate import Migrate, upgrade, stamp
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+from datetime import datetime, date
 import os
+import time
+import mimetypes
+import random
+import re
+import sqlite3
+import tempfile
+import click
 from werkzeug.utils import secure_filename
 import json
 import logging
+from collections import Counter
+from contextlib import contextmanager
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
+from flask_login.utils import login_url
 from werkzeug.security import generate_password_hash, check_password_hash
 from utils import (
     create_item_directory, save_item_images, save_agreement_image,
     create_summary_file, init_db, save_to_db
 )
-from drive_utils import save_to_drive
+from drive_utils import save_to_drive, delete_file, get_thumbnail, load_file_ref, load_file_refs, get_drive_service, reconcile_drive
+from thumbnail_cache import ThumbnailCache, sniff_image_type
+from upload_utils import UploadStore, UploadError, parse_upload_metadata
+from spec_vocabulary import SpecVocabulary, SPEC_FIELDS, spec_values, spec_value_changes, spec_key, clean_spec_value, DEFAULT_COMPLETION_LIMIT, MAX_COMPLETION_LIMIT
+from party_utils import normalize_nic, autocomplete_ranges, AUTOCOMPLETE_FIELDS, DEFAULT_AUTOCOMPLETE_LIMIT, MAX_AUTOCOMPLETE_LIMIT
+from api_utils import (
+    parse_fields, serialize_item, parse_date, parse_datetime, parse_bool, parse_limit,
+    encode_cursor, decode_cursor
+)
+from bulk_utils import split_amount, price_adjustment_values
+from device_utils import Blocklist, DuplicateDeviceError, normalize_imei, normalize_serial, read_identifiers
+from expense_utils import EXPENSE_CATEGORIES, PURCHASE_EXPENSE_COLUMNS, parse_expenses, profit_values
+from fragment_cache import FragmentCache
+from asset_utils import (
+    load_manifest, build_manifest, write_manifest, precompress_assets,
+    verify_assets, negotiate_encoding, available_encodings, compress_response
+)
+from profiling_utils import RequestProfile, ProfileStore
+from backup_utils import BackupStore, enable_wal, data_version
+from report_utils import PERIODS, SUMMARY_COLUMNS, SELL_THROUGH_COLUMNS, period_ranges, from_period, compute_periods, total_row, report_csv, report_pdf
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -28,6 +62,26 @@ app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///business.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['FRAGMENT_CACHE_MAX_ENTRIES'] = int(os.getenv('FRAGMENT_CACHE_MAX_ENTRIES', 2000))
+app.config['FRAGMENT_CACHE_MAX_BYTES'] = int(os.getenv('FRAGMENT_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+app.config['ASSET_MAX_AGE'] = 365 * 24 * 60 * 60  # Fingerprinted assets never change
+app.config['ADMIN_USERNAMES'] = [u.strip() for u in os.getenv('ADMIN_USERNAMES', '').split(',') if u.strip()]
+app.config['PROFILE_DIR'] = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+app.config['PROFILE_SAMPLE_RATE'] = float(os.getenv('PROFILE_SAMPLE_RATE', 0))  # Percent of requests
+app.config['PROFILE_MAX_FILES'] = int(os.getenv('PROFILE_MAX_FILES', 200))
+app.config['THUMBNAIL_CACHE_DIR'] = os.getenv('THUMBNAIL_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'thumbnails'))
+app.config['THUMBNAIL_CACHE_TTL'] = int(os.getenv('THUMBNAIL_CACHE_TTL', 7 * 24 * 60 * 60))
+app.config['THUMBNAIL_CACHE_MAX_BYTES'] = int(os.getenv('THUMBNAIL_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+app.config['UPLOAD_SPOOL_DIR'] = os.getenv('UPLOAD_SPOOL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'uploads'))
+app.config['UPLOAD_CHUNK_SIZE'] = int(os.getenv('UPLOAD_CHUNK_SIZE', 1024 * 1024))
+app.config['UPLOAD_MAX_SIZE'] = int(os.getenv('UPLOAD_MAX_SIZE', 50 * 1024 * 1024))  # Per file
+app.config['UPLOAD_SPOOL_TTL'] = int(os.getenv('UPLOAD_SPOOL_TTL', 24 * 60 * 60))
+app.config['SPEC_VOCABULARY_TTL'] = int(os.getenv('SPEC_VOCABULARY_TTL', 60))
+app.config['BACKUP_DIR'] = os.getenv('BACKUP_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'backups'))
+app.config['BACKUP_KEEP'] = int(os.getenv('BACKUP_KEEP', 14))
+app.config['BACKUP_DRIVE_PATH'] = os.getenv('BACKUP_DRIVE_PATH', '')  # Folder under GSE, e.g. Backups; empty keeps backups local
+app.config['BACKUP_WAL'] = os.getenv('BACKUP_WAL', 'false').lower() == 'true'  # Needs a local filesystem
+app.config['BLOCKLIST_PATH'] = os.getenv('BLOCKLIST_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'blocklist.bin'))
 
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
@@ -37,6 +91,12 @@ login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
 login_manager.login_message_category = 'warning'
 
+# Rendered index rows, keyed on (item id, updated_at)
+fragment_cache = FragmentCache(
+    max_entries=app.config['FRAGMENT_CACHE_MAX_ENTRIES'],
+    max_bytes=app.config['FRAGMENT_CACHE_MAX_BYTES']
+)
+
 # Add custom filter for JSON
 @app.template_filter('from_json')
 def from_json(value):
@@ -45,6 +105,192 @@ def from_json(value):
     except:
         return {}
 
+# Fingerprinted static assets (see `flask build-assets`)
+asset_manifest = load_manifest(app.static_folder)
+asset_sources = {fingerprinted: filename for filename, fingerprinted in asset_manifest.items()}
+
+@app.template_global()
+def asset_url(filename):
+    fingerprinted = asset_manifest.get(filename)
+    if fingerprinted is None:
+        return url_for('static', filename=filename)
+    return url_for('asset', filename=fingerprinted)
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    source = asset_sources.get(filename)
+    if source is None:
+        return 'Not found', 404
+
+    # Serve a precompressed copy when the build step produced one
+    source_path = os.path.join(app.static_folder, source)
+    precompressed = [e for e in available_encodings()
+                     if os.path.exists(source_path + ('.br' if e == 'br' else '.gz'))]
+    encoding = negotiate_encoding(request.accept_encodings, precompressed)
+
+    if encoding:
+        suffix = '.br' if encoding == 'br' else '.gz'
+        response = send_from_directory(
+            app.static_folder, source + suffix,
+            mimetype=mimetypes.guess_type(source)[0],
+            max_age=app.config['ASSET_MAX_AGE']
+        )
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_from_directory(app.static_folder, source, max_age=app.config['ASSET_MAX_AGE'])
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.after_request
+def compress(response):
+    return compress_response(response, request.accept_encodings)
+
+@app.cli.command('build-assets')
+@click.option('--check', is_flag=True, help='Only verify that fingerprints exist and are current.')
+def build_assets(check):
+    """Fingerprint and precompress static assets."""
+    if not check:
+        manifest = build_manifest(app.static_folder)
+        write_manifest(app.static_folder, manifest)
+        written = precompress_assets(app.static_folder, manifest)
+        click.echo(f"Fingerprinted {len(manifest)} assets, wrote {len(written)} precompressed files")
+
+    problems = verify_assets(app.static_folder, os.path.join(app.root_path, app.template_folder))
+    for problem in problems:
+        click.echo(problem, err=True)
+    if problems:
+        raise SystemExit(1)
+    click.echo('All referenced assets are fingerprinted')
+
+@app.cli.command('normalize-specs')
+@click.option('--dry-run', is_flag=True, help='Only list the values that would be merged.')
+def normalize_specs(dry_run):
+    """Merge near-duplicate spec values and rebuild their usage counts."""
+    items = Item.query.all()
+    usage = {}
+    for item in items:
+        for field, value in spec_values(item.specifications):
+            usage.setdefault((field, spec_key(value)), Counter())[value] += 1
+
+    # Each group takes its most used spelling
+    canonical = {}
+    for (field, key), spellings in sorted(usage.items()):
+        spelling = spellings.most_common(1)[0][0]
+        for value in spellings:
+            canonical[(field, value)] = spelling
+            if value != spelling:
+                click.echo(f"{field}: {value!r} ({spellings[value]}) -> {spelling!r}")
+    if dry_run:
+        return
+
+    changed = 0
+    for item in items:
+        specs = json.loads(item.specifications)
+        normalized = {
+            key: canonical.get((key, clean_spec_value(value)), value) if key in SPEC_FIELDS and value else value
+            for key, value in specs.items()
+        }
+        if normalized != specs:
+            item.specifications = json.dumps(normalized)
+            changed += 1
+
+    counts = Counter()
+    for item in items:
+        counts.update(spec_values(item.specifications))
+    db.session.execute(db.delete(SpecValue))
+    db.session.add_all(SpecValue(field=field, value=value, count=count) for (field, value), count in counts.items())
+    db.session.commit()
+    spec_vocabulary.load()
+    click.echo(f"Updated {changed} items; {len(counts)} distinct spec values")
+
+# Request profiling for admins (X-Profile header or ?_profile=1|sample) and sampled traffic
+profile_store = ProfileStore(app.config['PROFILE_DIR'], app.config['PROFILE_MAX_FILES'])
+
+def is_admin(user):
+    return user.is_authenticated and user.username in app.config['ADMIN_USERNAMES']
+
+@app.before_request
+def start_profiling():
+    if request.endpoint in ('static', 'asset'):
+        return
+    requested = request.headers.get('X-Profile') or request.args.get('_profile')
+    if requested and is_admin(current_user):
+        mode = 'sample' if requested == 'sample' else 'cprofile'
+    elif random.random() * 100 < app.config['PROFILE_SAMPLE_RATE']:
+        mode = 'cprofile'
+    else:
+        return
+    try:
+        profile = RequestProfile(mode)
+        profile.start()
+    except Exception as e:
+        # Profiling must never fail the request
+        app.logger.error(f"Error starting request profile: {str(e)}")
+        return
+    g.profile = profile
+
+@app.after_request
+def save_profile(response):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop()
+        try:
+            username = current_user.username if current_user.is_authenticated else None
+            name = profile_store.save(profile, request.method, request.full_path, response.status_code, username)
+            response.headers['X-Profile-Name'] = name
+        except Exception as e:
+            app.logger.error(f"Error saving request profile: {str(e)}")
+    return response
+
+@app.teardown_request
+def stop_profiling(exc):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop()
+
+@app.route('/admin/profiles')
+@login_required
+def admin_profiles():
+    if not is_admin(current_user):
+        abort(403)
+    return render_template('admin_profiles.html', profiles=profile_store.slowest())
+
+@app.route('/admin/profiles/<path:filename>')
+@login_required
+def admin_profile_file(filename):
+    if not is_admin(current_user):
+        abort(403)
+    return send_from_directory(app.config['PROFILE_DIR'], filename, as_attachment=True)
+
+@app.route('/admin/drive_issues')
+@login_required
+def admin_drive_issues():
+    if not is_admin(current_user):
+        abort(403)
+    issues = DriveIssue.query.filter(DriveIssue.resolved_at.is_(None)).order_by(DriveIssue.detected_at.desc()).all()
+    return render_template('admin_drive_issues.html', issues=issues, state=db.session.get(DriveSyncState, 1))
+
+@app.route('/admin/drive_issues/<int:issue_id>/resolve', methods=['POST'])
+@login_required
+def resolve_drive_issue(issue_id):
+    if not is_admin(current_user):
+        abort(403)
+    issue = db.get_or_404(DriveIssue, issue_id)
+    issue.resolved_at = datetime.utcnow()
+    db.session.commit()
+    flash('Issue marked as resolved.', 'success')
+    return redirect(url_for('admin_drive_issues'))
+
+@app.template_filter('file_ref')
+def file_ref_filter(value):
+    return load_file_ref(value)
+
+@app.template_filter('file_refs')
+def file_refs_filter(value):
+    return load_file_refs(value)
+
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -76,11 +322,53 @@ class User(UserMixin, db.Model):
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+@login_manager.unauthorized_handler
+def unauthorized():
+    # API clients get a JSON 401 instead of a redirect to the login page
+    if request.path.startswith('/api/'):
+        return jsonify({'error': 'Authentication required'}), 401
+    flash(login_manager.login_message, login_manager.login_message_category)
+    return redirect(login_url(login_manager.login_view, next_url=request.url))
+
+class Party(db.Model):
+    """A seller or buyer, identified by NIC."""
+    id = db.Column(db.Integer, primary_key=True)
+    # NOCASE so prefix searches on the indexes are case-insensitive
+    nic = db.Column(db.String(20, collation='NOCASE'), unique=True, nullable=False)
+    name = db.Column(db.String(100, collation='NOCASE'), nullable=False, index=True)
+    contact = db.Column(db.String(20), index=True)
+    location = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nic': self.nic,
+            'name': self.name,
+            'contact': self.contact,
+            'location': self.location,
+        }
+
+    def __repr__(self):
+        return f'<Party {self.nic}>'
+
+class SpecValue(db.Model):
+    """How many items use each spelling of a specification value."""
+    id = db.Column(db.Integer, primary_key=True)
+    field = db.Column(db.String(50), nullable=False)
+    value = db.Column(db.String(200), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.UniqueConstraint('field', 'value'),)
+
+    def __repr__(self):
+        return f'<SpecValue {self.field}={self.value}>'
+
 class Item(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     item_type = db.Column(db.String(50), nullable=False)  # laptop or smartphone
-    purchase_date = db.Column(db.Date, nullable=False)
+    purchase_date = db.Column(db.Date, nullable=False, index=True)
     
     # Seller details
     seller_name = db.Column(db.String(100), nullable=False)
@@ -93,11 +381,28 @@ class Item(db.Model):
     buyer_nic = db.Column(db.String(20))
     buyer_contact = db.Column(db.String(20))
     buyer_location = db.Column(db.String(200))
+
+    # Directory entries for the seller and buyer; the columns above keep
+    # the details as they were at the time of the purchase or sale
+    seller_id = db.Column(db.Integer, db.ForeignKey('party.id'), index=True)
+    buyer_id = db.Column(db.Integer, db.ForeignKey('party.id'), index=True)
+    seller = db.relationship('Party', foreign_keys=[seller_id])
+    buyer = db.relationship('Party', foreign_keys=[buyer_id])
     
     # Specifications (stored as JSON)
     specifications = db.Column(db.Text, nullable=False)
+
+    # Device identifiers, normalized; a unit can be in stock only once
+    imei = db.Column(db.String(15), index=True)
+    serial_number = db.Column(db.String(100), index=True)
+    __table_args__ = (
+        db.Index('uq_item_imei_in_stock', 'imei', unique=True,
+                 sqlite_where=db.text('imei IS NOT NULL AND selling_price IS NULL')),
+        db.Index('uq_item_serial_number_in_stock', 'serial_number', unique=True,
+                 sqlite_where=db.text('serial_number IS NOT NULL AND selling_price IS NULL')),
+    )
     
-    # Purchase details
+    # Purchase details; the expense columns mirror the purchase entries of the ledger
     item_price = db.Column(db.Float, nullable=False)
     transport_cost = db.Column(db.Float, default=0)
     food_cost = db.Column(db.Float, default=0)
@@ -105,22 +410,482 @@ class Item(db.Model):
     other_expenses = db.Column(db.Float, default=0)
     
     # File paths (stored as JSON)
-    images = db.Column(db.Text, nullable=False)  # List of image paths
-    agreement_image = db.Column(db.String(255), nullable=False)
+    images = db.Column(db.Text, nullable=False)  # List of Drive file references
+    agreement_image = db.Column(db.Text, nullable=False)  # File reference (JSON)
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Sale details (if sold)
-    selling_date = db.Column(db.Date)
+    selling_date = db.Column(db.Date, index=True)
     selling_price = db.Column(db.Float)
-    selling_expenses = db.Column(db.Float, default=0)
+    selling_expenses = db.Column(db.Float, default=0)  # Total of the sale entries
     gross_profit = db.Column(db.Float)
     net_profit = db.Column(db.Float)
 
+    expenses = db.relationship('Expense', backref='item', cascade='all, delete-orphan')
+
+    def expense_amounts(self, phase):
+        """{category: amount} of the item's ledger entries for a phase."""
+        amounts = dict.fromkeys(EXPENSE_CATEGORIES, 0.0)
+        for expense in self.expenses:
+            if expense.phase == phase:
+                amounts[expense.category] += expense.amount
+        return amounts
+
     def __repr__(self):
         return f'<Item {self.name}>'
 
+class Expense(db.Model):
+    """Expense ledger: one category of an item's expenses, booked at purchase or at sale."""
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id', ondelete='CASCADE'), nullable=False)
+    phase = db.Column(db.String(10), nullable=False)  # purchase or sale
+    category = db.Column(db.String(20), nullable=False)  # transport, food, fuel or other
+    amount = db.Column(db.Float, nullable=False)
+    # Also serves per-item sums
+    __table_args__ = (db.UniqueConstraint('item_id', 'phase', 'category'),)
+
+    def __repr__(self):
+        return f'<Expense {self.phase} {self.category} {self.amount}>'
+
+class DriveFolder(db.Model):
+    """Folder-ID mapping of the app's Drive folders, kept current by `flask reconcile-drive`."""
+    id = db.Column(db.String(64), primary_key=True)  # Drive folder ID
+    name = db.Column(db.String(255), nullable=False)
+    parent_id = db.Column(db.String(64))  # None for the GSE folder
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __table_args__ = (db.Index('ix_drive_folder_parent_id_name', 'parent_id', 'name'),)
+
+    def __repr__(self):
+        return f'<DriveFolder {self.name}>'
+
+class DriveSyncState(db.Model):
+    """Where the last Drive reconciliation stopped (a single row)."""
+    id = db.Column(db.Integer, primary_key=True)
+    start_page_token = db.Column(db.String(64))
+    last_run_at = db.Column(db.DateTime)
+    last_duration = db.Column(db.Float)  # Seconds
+    last_changes = db.Column(db.Integer)
+
+class ReportSnapshot(db.Model):
+    """Report figures of a closed period, computed once and kept."""
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(10), nullable=False)  # month or quarter
+    period_key = db.Column(db.String(10), nullable=False)  # 2024-03 or 2024-Q1
+    data = db.Column(db.Text, nullable=False)  # JSON report row
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.UniqueConstraint('period', 'period_key'),)
+
+    def __repr__(self):
+        return f'<ReportSnapshot {self.period_key}>'
+
+class DriveIssue(db.Model):
+    """A mismatch between Drive and the database found by reconciliation."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # broken_ref, orphan or renamed_folder
+    file_id = db.Column(db.String(64), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id', ondelete='SET NULL'), index=True)
+    detail = db.Column(db.String(255))
+    detected_at = db.Column(db.DateTime, default=datetime.utcnow)
+    resolved_at = db.Column(db.DateTime)
+    item = db.relationship('Item')
+    __table_args__ = (db.Index('ix_drive_issue_resolved_at_kind', 'resolved_at', 'kind'),)
+
+    def __repr__(self):
+        return f'<DriveIssue {self.kind} {self.file_id}>'
+
+def setup_database():
+    """Migrate the database to the latest schema, creating it if it is new.
+
+    A new database gets every table from the models and is stamped with
+    the latest migration, since the first migration expects the original
+    item table to exist already.
+    """
+    migrations = os.path.join(app.root_path, 'migrations')
+    if db.inspect(db.engine).has_table('item'):
+        upgrade(migrations)
+        return 'upgraded'
+    db.create_all()
+    stamp(migrations)
+    return 'created'
+
+@app.cli.command('setup-db')
+def setup_db():
+    """Create a new database or migrate an existing one; run before (re)starting the app."""
+    click.echo(f"Database {setup_database()}")
+
+def upsert_party(nic, name, contact=None, location=None):
+    """Return the Party with this NIC, added or updated with the latest details."""
+    nic = normalize_nic(nic)
+    if not nic:
+        return None
+    party = Party.query.filter_by(nic=nic).first()
+    if party is None:
+        party = Party(nic=nic, name=name, contact=contact, location=location)
+        db.session.add(party)
+    else:
+        party.name = name or party.name
+        party.contact = contact or party.contact
+        party.location = location or party.location
+    return party
+
+def link_parties(item):
+    """Point the item's seller and buyer at their directory entries."""
+    item.seller = upsert_party(item.seller_nic, item.seller_name, item.seller_contact, item.seller_location)
+    item.buyer = upsert_party(item.buyer_nic, item.buyer_name, item.buyer_contact, item.buyer_location)
+
+def load_spec_values():
+    return db.session.execute(db.select(SpecValue.field, SpecValue.value, SpecValue.count)).all()
+
+def spec_values_signature():
+    return tuple(db.session.execute(db.select(
+        db.func.count(SpecValue.id), db.func.max(SpecValue.id), db.func.total(SpecValue.count)
+    )).one())
+
+# Spec value autocomplete; checks spec_value for other workers' writes every SPEC_VOCABULARY_TTL seconds
+spec_vocabulary = SpecVocabulary(load_spec_values, spec_values_signature, ttl=app.config['SPEC_VOCABULARY_TTL'])
+
+def canonical_specs(specs):
+    """Replace near-duplicate spec values with their most used spelling."""
+    for field in SPEC_FIELDS:
+        if specs.get(field) not in (None, ''):
+            specs[field] = spec_vocabulary.canonical(field, clean_spec_value(specs[field]))
+    return specs
+
+def record_spec_changes(old_specs, new_specs):
+    """Update spec value counts for an item written in the current transaction.
+
+    The in-memory vocabulary follows once the transaction commits.
+    """
+    changes = spec_value_changes(old_specs, new_specs)
+    if not changes:
+        return
+    stmt = sqlite_insert(SpecValue).values([
+        {'field': field, 'value': value, 'count': delta} for (field, value), delta in changes.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['field', 'value'],
+        set_={'count': SpecValue.count + stmt.excluded['count']}
+    )
+    db.session.execute(stmt)
+    db.session.info.setdefault('spec_changes', Counter()).update(changes)
+
+@event.listens_for(Session, 'after_commit')
+def apply_spec_changes(session):
+    changes = session.info.pop('spec_changes', None)
+    if changes:
+        spec_vocabulary.apply(changes)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_spec_changes(session, previous_transaction):
+    session.info.pop('spec_changes', None)
+
+# Stolen or otherwise blocked devices, imported with `flask import-blocklist`
+blocklist = Blocklist(app.config['BLOCKLIST_PATH'])
+
+def device_identifiers(source):
+    """Normalized (imei, serial_number) from a form or JSON dict."""
+    return normalize_imei(source.get('imei')), normalize_serial(source.get('serial_number'))
+
+def identifier_matches(imei, serial_number, exclude_id=None):
+    """Items sharing the identifiers, newest first, and the identifiers on the blocklist."""
+    conditions = []
+    if imei:
+        conditions.append(Item.imei == imei)
+    if serial_number:
+        conditions.append(Item.serial_number == serial_number)
+    items = []
+    if conditions:
+        # Each condition is one probe of its column's index
+        query = Item.query.filter(db.or_(*conditions))
+        if exclude_id is not None:
+            query = query.filter(Item.id != exclude_id)
+        items = query.order_by(Item.purchase_date.desc()).all()
+    blocked = [value for value in (imei, serial_number) if value and value in blocklist]
+    return items, blocked
+
+def check_device(imei, serial_number, exclude_id=None):
+    """Warnings flagging a device at intake.
+
+    Raises DuplicateDeviceError if another item with the same IMEI or
+    serial number is still in stock.
+    """
+    items, blocked = identifier_matches(imei, serial_number, exclude_id)
+    for item in items:
+        if item.selling_price is None:
+            raise DuplicateDeviceError(f'This device is already in stock as item #{item.id} ({item.name})')
+    warnings = [f'{value} is on the blocklist of stolen or blocked devices' for value in blocked]
+    warnings.extend(
+        f'This device was bought before as item #{item.id} ({item.name}) from {item.seller_name} '
+        f'on {item.purchase_date} and sold on {item.selling_date}'
+        for item in items
+    )
+    return warnings
+
+@contextmanager
+def stocking(imei, serial_number, exclude_id=None):
+    """Write an item that is in stock with these identifiers.
+
+    check_device runs before the write, so a concurrent intake of the same
+    device can commit in between; the partial unique indexes then reject
+    this write at a flush or the commit. That is raised as the
+    DuplicateDeviceError check_device would have raised; other integrity
+    errors are re-raised as they are.
+    """
+    try:
+        yield
+    except IntegrityError:
+        db.session.rollback()
+        check_device(imei, serial_number, exclude_id)
+        raise
+
+@app.cli.command('import-blocklist')
+@click.argument('source', type=click.File('r'))
+@click.option('--replace', is_flag=True, help='Replace the blocklist instead of adding to it.')
+def import_blocklist(source, replace):
+    """Add the IMEIs and serial numbers listed in SOURCE to the blocklist."""
+    count = blocklist.write(read_identifiers(source), replace=replace)
+    click.echo(f"Blocklist holds {count} identifiers")
+    blocked = Item.query.filter(Item.selling_price.is_(None), db.or_(Item.imei.isnot(None), Item.serial_number.isnot(None))).all()
+    for item in blocked:
+        if (item.imei and item.imei in blocklist) or (item.serial_number and item.serial_number in blocklist):
+            click.echo(f"In stock and blocked: item #{item.id} {item.name}")
+
+class DriveFolderMap:
+    """The drive_folder table as the folder map of save_to_drive.
+
+    It runs on its own connections, outside the request's session: reads
+    don't flush pending changes, and each write commits at once, so no
+    write transaction is held while files upload. The map only saves
+    Drive searches, so a write that cannot get the lock is skipped.
+    """
+
+    def lookup(self, parent_id, name):
+        with db.engine.connect() as conn:
+            return conn.execute(
+                db.select(DriveFolder.id).filter_by(parent_id=parent_id, name=name).limit(1)
+            ).scalar()
+
+    def _write(self, statements):
+        try:
+            with db.engine.begin() as conn:
+                for stmt in statements:
+                    conn.execute(stmt)
+        except OperationalError as e:
+            app.logger.warning(f"Could not update the Drive folder map: {str(e)}")
+
+    def remember(self, folder_id, name, parent_id):
+        # Another worker may have just mapped the same folder
+        stmt = sqlite_insert(DriveFolder).values(id=folder_id, name=name, parent_id=parent_id)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['id'],
+            set_={'name': name, 'parent_id': parent_id, 'updated_at': datetime.utcnow()}
+        )
+        self._write([stmt])
+
+    def forget(self, folder_id):
+        folder_ids = []
+        with db.engine.connect() as conn:
+            while folder_id and folder_id not in folder_ids:
+                parent_id = conn.execute(
+                    db.select(DriveFolder.parent_id).filter_by(id=folder_id)
+                ).first()
+                if parent_id is None:
+                    break
+                folder_ids.append(folder_id)
+                folder_id = parent_id[0]
+        if folder_ids:
+            self._write([db.delete(DriveFolder).where(DriveFolder.id.in_(folder_ids))])
+
+drive_folder_map = DriveFolderMap()
+
+def drive_file_references():
+    """Map each Drive file ID the items reference to the first item using it."""
+    referenced = {}
+    rows = db.session.execute(db.select(Item.id, Item.images, Item.agreement_image).order_by(Item.id))
+    for item_id, images, agreement_image in rows:
+        for ref in load_file_refs(images) + [load_file_ref(agreement_image)]:
+            if ref and ref.get('id'):
+                referenced.setdefault(ref['id'], item_id)
+    return referenced
+
+@app.cli.command('reconcile-drive')
+@click.option('--full', is_flag=True, help='List everything again instead of reading the changes since the last run.')
+def reconcile_drive_command(full):
+    """Check Drive against the database using only the changes since the last run."""
+    started = time.monotonic()
+    state = db.session.get(DriveSyncState, 1) or DriveSyncState(id=1)
+    folders = {
+        folder.id: {'name': folder.name, 'parent': folder.parent_id}
+        for folder in DriveFolder.query.all()
+    }
+    referenced = drive_file_references()
+    # Snapshots uploaded by `flask backup-db` are referenced by its manifest
+    for entry in BackupStore(app.config['BACKUP_DIR']).snapshots():
+        if entry['drive'] and entry['drive'].get('id'):
+            referenced.setdefault(entry['drive']['id'], None)
+    report = reconcile_drive(
+        get_drive_service(), None if full else state.start_page_token, folders, referenced
+    )
+
+    # Folder-ID mapping
+    existing = {folder.id: folder for folder in DriveFolder.query.all()}
+    for folder_id, folder in existing.items():
+        if folder_id not in folders:
+            db.session.delete(folder)
+    for folder_id, entry in folders.items():
+        folder = existing.get(folder_id)
+        if folder is None:
+            db.session.add(DriveFolder(id=folder_id, name=entry['name'], parent_id=entry['parent']))
+        elif (folder.name, folder.parent_id) != (entry['name'], entry['parent']):
+            folder.name, folder.parent_id = entry['name'], entry['parent']
+
+    now = datetime.utcnow()
+    open_issues = {
+        (issue.kind, issue.file_id): issue
+        for issue in DriveIssue.query.filter(DriveIssue.resolved_at.is_(None))
+    }
+
+    def resolve(kind, file_id):
+        issue = open_issues.pop((kind, file_id), None)
+        if issue is not None:
+            issue.resolved_at = now
+
+    def open_issue(kind, file_id, item_id=None, detail=None):
+        if (kind, file_id) not in open_issues:
+            open_issues[(kind, file_id)] = DriveIssue(kind=kind, file_id=file_id, item_id=item_id, detail=detail)
+            db.session.add(open_issues[(kind, file_id)])
+
+    for kind, file_id in list(open_issues):
+        if kind == 'broken_ref' and (file_id not in referenced or file_id in report['restored']
+                                     or (report['full_scan'] and file_id not in report['broken'])):
+            resolve(kind, file_id)
+        elif kind == 'orphan' and (file_id in referenced or file_id in report['removed']
+                                   or (report['full_scan'] and file_id not in report['orphans'])):
+            resolve(kind, file_id)
+
+    for file_id in report['broken']:
+        open_issue('broken_ref', file_id, referenced[file_id], 'Referenced file was deleted or trashed')
+    for file_id, name in report['orphans'].items():
+        open_issue('orphan', file_id, detail=name)
+    for folder_id, old_name, new_name in report['renamed_folders']:
+        open_issue('renamed_folder', folder_id, detail=f"{old_name} -> {new_name}")
+
+    state.start_page_token = report['start_page_token']
+    state.last_run_at = now
+    state.last_duration = time.monotonic() - started
+    state.last_changes = report['changes']
+    db.session.add(state)
+    db.session.commit()
+
+    click.echo(
+        f"{'Full scan of' if report['full_scan'] else 'Processed'} {report['changes']} "
+        f"{'files' if report['full_scan'] else 'changes'} in {state.last_duration:.1f}s: "
+        f"{len(report['broken'])} broken references, {len(report['orphans'])} orphaned uploads, "
+        f"{len(report['renamed_folders'])} renamed folders, {len(folders)} folders mapped"
+    )
+
+def upload_latest_backup(backup_store):
+    """Upload the newest snapshot to BACKUP_DRIVE_PATH unless it is already there."""
+    latest = backup_store.latest()
+    if not app.config['BACKUP_DRIVE_PATH'] or latest is None or latest['drive']:
+        return
+    try:
+        file_ref = save_to_drive(
+            backup_store.path(latest['name']),
+            os.path.join(app.config['BACKUP_DRIVE_PATH'], latest['name']),
+            drive_folder_map
+        )
+        backup_store.mark_uploaded(latest['name'], file_ref)
+        click.echo(f"Uploaded {latest['name']} to GSE/{app.config['BACKUP_DRIVE_PATH']}")
+    except Exception as e:
+        app.logger.error(f"Error uploading backup {latest['name']}: {str(e)}")
+
+def delete_backup_copy(entry):
+    """Delete the Drive copy of a snapshot rotated out of the backup store."""
+    if not entry['drive'] or not entry['drive'].get('id'):
+        return
+    try:
+        delete_file(entry['drive']['id'])
+        click.echo(f"Deleted {entry['name']} from Drive")
+    except Exception as e:
+        # `flask reconcile-drive` lists the copy as an orphan from now on
+        app.logger.error(f"Error deleting backup {entry['name']} from Drive: {str(e)}")
+
+@app.cli.command('backup-db')
+@click.option('--interval', type=int, default=0, help='Keep running and check for changes every this many minutes.')
+@click.option('--verify', is_flag=True, help='Check the stored snapshots against their checksums instead.')
+def backup_db(interval, verify):
+    """Snapshot the database without blocking writers, compress it and rotate old snapshots."""
+    backup_store = BackupStore(app.config['BACKUP_DIR'], keep=app.config['BACKUP_KEEP'], on_remove=delete_backup_copy)
+    if verify:
+        problems = 0
+        for entry, problem in backup_store.verify():
+            click.echo(f"{entry['name']}: {problem or 'ok'}")
+            problems += bool(problem)
+        if problems:
+            raise SystemExit(1)
+        return
+
+    source = sqlite3.connect(db.engine.url.database)
+    # In WAL mode the backup reads a snapshot while requests keep writing;
+    # WAL needs shared memory, which network filesystems don't provide
+    if app.config['BACKUP_WAL'] and not enable_wal(source):
+        click.echo('Could not switch the database to WAL mode; writes during a backup make it start over', err=True)
+    last_version = None
+    while True:
+        # data_version only moves when another connection commits
+        version = data_version(source)
+        if version != last_version:
+            entry = backup_store.create(source)
+            if entry:
+                click.echo(f"Wrote {entry['name']} ({entry['size']} bytes, sha256 {entry['sha256'][:12]})")
+            else:
+                click.echo('No changes since the last snapshot')
+            last_version = version
+        upload_latest_backup(backup_store)
+        if not interval:
+            break
+        time.sleep(interval * 60)
+
+def set_expenses(item, phase, amounts):
+    """Replace the item's ledger entries of a phase with {category: amount}."""
+    current = {expense.category: expense for expense in item.expenses if expense.phase == phase}
+    for category in EXPENSE_CATEGORIES:
+        amount = amounts.get(category, 0)
+        entry = current.get(category)
+        if not amount:
+            if entry is not None:
+                item.expenses.remove(entry)
+        elif entry is None:
+            item.expenses.append(Expense(phase=phase, category=category, amount=amount))
+        else:
+            entry.amount = amount
+    if phase == 'purchase':
+        for category, column in PURCHASE_EXPENSE_COLUMNS.items():
+            setattr(item, column, amounts.get(category, 0))
+
+def refresh_profits(item_ids):
+    """Recompute the stored profits of items from the expense ledger."""
+    db.session.flush()
+    db.session.execute(
+        db.update(Item).where(Item.id.in_(item_ids)).values(profit_values(Item, Expense))
+        .execution_options(synchronize_session=False)
+    )
+
+@app.cli.command('rebuild-profits')
+def rebuild_profits():
+    """Recompute every item's profits from the expense ledger."""
+    result = db.session.execute(
+        db.update(Item).values(profit_values(Item, Expense)).execution_options(synchronize_session=False)
+    )
+    # Rebuilding follows corrections of old records, so recompute the stored reports too
+    db.session.execute(db.delete(ReportSnapshot))
+    db.session.commit()
+    click.echo(f"Recomputed profits of {result.rowcount} items")
+
 def save_image(file, item_id, image_type):
     if file and file.filename:
         filename = secure_filename(f"{item_id}_{image_type}_{file.filename}")
@@ -138,11 +903,131 @@ def uploaded_file(filename):
 def index():
     try:
         items = Item.query.order_by(Item.purchase_date.desc()).all()
-        return render_template('index.html', items=items)
+        item_rows = [
+            Markup(fragment_cache.get_or_render(
+                (item.id, item.updated_at),
+                lambda item=item: render_template('_item_row.html', item=item)
+            ))
+            for item in items
+        ]
+        return render_template('index.html', items=items, item_rows=item_rows)
     except Exception as e:
         app.logger.error(f"Error loading items: {str(e)}")
         flash('Error loading items. Please try again.', 'error')
-        return render_template('index.html', items=[])
+        return render_template('index.html', items=[], item_rows=[])
+
+def forget_reports(*days):
+    """Drop the stored reports of the periods of the dates and all later ones.
+
+    Call it in the transaction that writes items or expenses, with the
+    dates before and after the change. Opening stock counts every earlier
+    purchase and sale, so a back-dated change makes later periods stale too.
+    """
+    days = [day.date() if isinstance(day, datetime) else day for day in days if day]
+    if not days:
+        return
+    first = min(days)
+    db.session.execute(db.delete(ReportSnapshot).where(db.or_(*(
+        db.and_(ReportSnapshot.period == period, from_period(ReportSnapshot.period_key, period, first))
+        for period in PERIODS
+    ))))
+
+def forget_item_reports(item_ids):
+    """forget_reports for the current dates of items about to change."""
+    forget_reports(*db.session.execute(
+        db.select(db.func.min(Item.purchase_date), db.func.min(Item.selling_date)).where(Item.id.in_(item_ids))
+    ).one())
+
+def period_report(period, year):
+    """Report rows for each period of a year and their total.
+
+    Periods that ended before today are closed: their rows come from
+    report_snapshot, or are computed once and stored there until a write
+    drops them (see forget_reports).
+    """
+    ranges = period_ranges(period, year)
+    rows = {
+        snapshot.period_key: json.loads(snapshot.data)
+        for snapshot in ReportSnapshot.query.filter(
+            ReportSnapshot.period == period,
+            ReportSnapshot.period_key.in_([key for key, _, _ in ranges])
+        )
+    }
+    missing = [r for r in ranges if r[0] not in rows]
+    if missing:
+        computed = compute_periods(db.session, period, missing)
+        today = date.today()
+        closed = [
+            {'period': period, 'period_key': key, 'data': json.dumps(computed[key])}
+            for key, _, end in missing if end <= today
+        ]
+        if closed:
+            # Another worker may have stored the same periods meanwhile
+            db.session.execute(sqlite_insert(ReportSnapshot).values(closed).on_conflict_do_nothing())
+            db.session.commit()
+        rows.update((key, computed[key]) for key, _, _ in missing)
+    rows = [rows[key] for key, _, _ in ranges]
+    return rows, total_row(rows, str(year))
+
+def report_params():
+    period = request.args.get('period', 'month')
+    if period not in PERIODS:
+        abort(400)
+    try:
+        year = int(request.args.get('year', date.today().year))
+    except ValueError:
+        abort(400)
+    # The last period of a year ends on 1 January of the next one
+    if not date.min.year <= year < date.max.year:
+        abort(400)
+    return period, year
+
+@app.route('/reports')
+@login_required
+def reports():
+    period, year = report_params()
+    try:
+        rows, total = period_report(period, year)
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error building report: {str(e)}")
+        flash('Error building the report. Please try again.', 'error')
+        rows, total = [], None
+    first_year = db.session.execute(db.select(db.func.min(Item.purchase_date))).scalar()
+    years = range(date.today().year, (first_year.year if first_year else date.today().year) - 1, -1)
+    return render_template(
+        'reports.html', rows=rows, total=total, period=period, year=year, years=years,
+        summary_columns=SUMMARY_COLUMNS, sell_through_columns=SELL_THROUGH_COLUMNS
+    )
+
+@app.route('/reports/export.<fmt>')
+@login_required
+def export_report(fmt):
+    period, year = report_params()
+    rows, total = period_report(period, year)
+    filename = f"report-{year}-{period}.{fmt}"
+    if fmt == 'csv':
+        body, mimetype = report_csv(rows, total), 'text/csv'
+    elif fmt == 'pdf':
+        title = f"Green Super Electronics - {period.capitalize()}ly report {year}"
+        body, mimetype = report_pdf(title, rows, total), 'application/pdf'
+    else:
+        abort(404)
+    return app.response_class(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}'
+    })
+
+@app.cli.command('clear-report-cache')
+def clear_report_cache():
+    """Drop stored closed-period reports, e.g. after correcting old records."""
+    deleted = db.session.execute(db.delete(ReportSnapshot)).rowcount
+    db.session.commit()
+    click.echo(f"Removed {deleted} stored period reports")
+
+@app.route('/cache_stats')
+@login_required
+def cache_stats():
+    return jsonify(fragment_cache.stats())
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -193,6 +1078,114 @@ def logout():
     flash('You have been logged out.', 'info')
     return redirect(url_for('login'))
 
+upload_store = UploadStore(
+    app.config['UPLOAD_SPOOL_DIR'],
+    chunk_size=app.config['UPLOAD_CHUNK_SIZE'],
+    max_size=app.config['UPLOAD_MAX_SIZE'],
+    ttl=app.config['UPLOAD_SPOOL_TTL']
+)
+
+def save_uploads_to_drive(token_field, file_field, drive_dir):
+    """Upload the files posted with a form to Drive and return their refs.
+
+    Files normally arrive as tokens of completed chunked uploads in
+    token_field; plain multipart files in file_field are still accepted.
+    """
+    file_refs = []
+    for token in request.form.getlist(token_field):
+        local_path, upload = upload_store.claim(token, current_user.id)
+        filename = secure_filename(upload['filename']) or token
+        file_refs.append(save_to_drive(local_path, os.path.join(drive_dir, filename), drive_folder_map))
+        # Kept until the item is committed, so a failed submit can be sent
+        # again with the same tokens
+        g.setdefault('claimed_uploads', []).append(token)
+
+    for file in request.files.getlist(file_field):
+        if file and file.filename:
+            # Save locally first, under a name of its own: concurrent
+            # requests may upload files with the same name
+            filename = secure_filename(file.filename)
+            fd, local_path = tempfile.mkstemp(suffix=f"_{filename}", dir=app.config['UPLOAD_FOLDER'])
+            os.close(fd)
+            file.save(local_path)
+
+            # Upload to Drive, then clean up the local file
+            try:
+                file_refs.append(save_to_drive(local_path, os.path.join(drive_dir, filename), drive_folder_map))
+            finally:
+                os.remove(local_path)
+    return file_refs
+
+def discard_claimed_uploads():
+    """Delete the chunked uploads saved to Drive by this request, once its changes are committed."""
+    for token in g.pop('claimed_uploads', []):
+        upload_store.discard(token)
+
+def upload_headers(upload):
+    return {
+        'Upload-Offset': str(upload['offset']),
+        'Upload-Length': str(upload['length']),
+        'Cache-Control': 'no-store',
+    }
+
+@app.errorhandler(UploadError)
+def upload_error(e):
+    return jsonify({'error': str(e)}), e.status
+
+@app.route('/api/v1/uploads', methods=['POST'])
+@login_required
+def create_upload():
+    """Start a chunked upload (tus style): Upload-Length and Upload-Metadata headers."""
+    length = request.headers.get('Upload-Length', type=int)
+    if length is None:
+        raise UploadError('Upload-Length header is required')
+    metadata = parse_upload_metadata(request.headers.get('Upload-Metadata'))
+    if not metadata.get('filename'):
+        raise UploadError('Upload-Metadata must include filename')
+
+    token = upload_store.create(metadata['filename'], length, current_user.id, metadata.get('filetype'))
+    upload = upload_store.info(token, current_user.id)
+    response = jsonify({'token': token, 'offset': 0, 'length': length, 'chunk_size': upload_store.chunk_size})
+    response.status_code = 201
+    response.headers.update(upload_headers(upload))
+    response.headers['Location'] = url_for('get_upload', token=token)
+    return response
+
+@app.route('/api/v1/uploads/<token>', methods=['GET', 'HEAD'])
+@login_required
+def get_upload(token):
+    """Report how much of an upload has arrived so the client can resume."""
+    upload = upload_store.info(token, current_user.id)
+    response = jsonify({'token': token, 'offset': upload['offset'], 'length': upload['length'],
+                        'complete': upload['complete'], 'chunk_size': upload_store.chunk_size})
+    response.headers.update(upload_headers(upload))
+    return response
+
+@app.route('/api/v1/uploads/<token>', methods=['PATCH'])
+@login_required
+def append_upload(token):
+    """Append one chunk at Upload-Offset, streamed straight to the spool file."""
+    if request.mimetype != 'application/offset+octet-stream':
+        raise UploadError('Content-Type must be application/offset+octet-stream', 415)
+    offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None:
+        raise UploadError('Upload-Offset header is required')
+    if request.content_length is None:
+        raise UploadError('Content-Length header is required', 411)
+
+    upload_store.append(token, current_user.id, offset, request.stream, request.content_length)
+    upload = upload_store.info(token, current_user.id)
+    response = app.response_class(status=204)
+    response.headers.update(upload_headers(upload))
+    return response
+
+@app.route('/api/v1/uploads/<token>', methods=['DELETE'])
+@login_required
+def delete_upload(token):
+    upload_store.info(token, current_user.id)
+    upload_store.discard(token)
+    return '', 204
+
 @app.route('/add_item', methods=['GET', 'POST'])
 @login_required
 def add_item():
@@ -215,12 +1208,12 @@ def add_item():
             remarks = request.form.get('remarks', '')  # Get remarks separately
 
             # Process expenses
-            expenses = {
-                'transport': float(request.form.get('expenses[transport]', 0)),
-                'food': float(request.form.get('expenses[food]', 0)),
-                'fuel': float(request.form.get('expenses[fuel]', 0)),
-                'other': float(request.form.get('expenses[other]', 0))
-            }
+            expenses = parse_expenses(request.form, 'expenses[{category}]')
+
+            # Flag the device against earlier purchases and the blocklist
+            # before anything is uploaded
+            imei, serial_number = device_identifiers(request.form)
+            warnings = check_device(imei, serial_number)
 
             # Process specifications based on item type
             app.logger.debug("Processing specifications with form data:")
@@ -252,6 +1245,7 @@ def add_item():
 
             # Add remarks to specifications
             specs['remarks'] = remarks
+            canonical_specs(specs)
             app.logger.debug(f"Final processed specifications: {specs}")
 
             # Create item directory structure
@@ -259,39 +1253,12 @@ def add_item():
             product_images_dir = os.path.join(item_dir, 'Product images')
             agreement_dir = os.path.join(item_dir, 'Agreement')
 
-            # Save item images
-            item_images = request.files.getlist('item_images')
-            image_paths = []
-            for image in item_images:
-                if image and image.filename:
-                    # Save locally first
-                    filename = secure_filename(image.filename)
-                    local_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    image.save(local_path)
-                    
-                    # Upload to Drive
-                    drive_path = os.path.join(product_images_dir, filename)
-                    web_link = save_to_drive(local_path, drive_path)
-                    
-                    # Clean up local file
-                    os.remove(local_path)
-                    
-                    image_paths.append(web_link)
-
-            # Save agreement image
-            agreement_image = request.files['agreement_image']
-            if agreement_image and agreement_image.filename:
-                # Save locally first
-                filename = secure_filename(agreement_image.filename)
-                local_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                agreement_image.save(local_path)
-                
-                # Upload to Drive
-                drive_path = os.path.join(agreement_dir, filename)
-                agreement_link = save_to_drive(local_path, drive_path)
-                
-                # Clean up local file
-                os.remove(local_path)
+            # Save item images and the agreement from their upload tokens
+            image_paths = save_uploads_to_drive('item_image_tokens', 'item_images', product_images_dir)
+            agreement_refs = save_uploads_to_drive('agreement_image_token', 'agreement_image', agreement_dir)
+            if not agreement_refs:
+                raise ValueError('Agreement image is required')
+            agreement_link = json.dumps(agreement_refs[0])
 
             # Create new item
             new_item = Item(
@@ -303,19 +1270,25 @@ def add_item():
                 seller_location=seller_location,
                 purchase_date=purchase_date,
                 item_price=item_price,
-                transport_cost=expenses['transport'],
-                food_cost=expenses['food'],
-                fuel_cost=expenses['fuel'],
-                other_expenses=expenses['other'],
                 specifications=json.dumps(specs),
+                imei=imei,
+                serial_number=serial_number,
                 images=json.dumps(image_paths),
                 agreement_image=agreement_link
             )
+            set_expenses(new_item, 'purchase', expenses)
 
-            db.session.add(new_item)
-            db.session.commit()
+            with stocking(imei, serial_number):
+                link_parties(new_item)
+                record_spec_changes(None, new_item.specifications)
+                forget_reports(new_item.purchase_date)
+                db.session.add(new_item)
+                db.session.commit()
+            discard_claimed_uploads()
 
             flash('Item added successfully!', 'success')
+            for warning in warnings:
+                flash(warning, 'warning')
             return redirect(url_for('index'))
 
         except Exception as e:
@@ -325,6 +1298,36 @@ def add_item():
 
     return render_template('add_item.html')
 
+thumbnail_cache = ThumbnailCache(
+    app.config['THUMBNAIL_CACHE_DIR'],
+    ttl=app.config['THUMBNAIL_CACHE_TTL'],
+    max_bytes=app.config['THUMBNAIL_CACHE_MAX_BYTES']
+)
+
+@app.route('/drive/thumbnail/<file_id>')
+@login_required
+def drive_thumbnail(file_id):
+    if not re.fullmatch(r'[A-Za-z0-9_-]+', file_id):
+        abort(404)
+    size = min(max(request.args.get('size', 220, type=int), 32), 1600)
+    key = f"{file_id}_s{size}"
+
+    data = thumbnail_cache.get(key)
+    if data is None:
+        try:
+            data = get_thumbnail(file_id, size)
+        except Exception as e:
+            app.logger.error(f"Error fetching thumbnail: {str(e)}")
+            abort(502)
+        if data is None:
+            abort(404)
+        thumbnail_cache.set(key, data)
+
+    response = app.response_class(data, mimetype=sniff_image_type(data))
+    response.cache_control.private = True
+    response.cache_control.max_age = app.config['THUMBNAIL_CACHE_TTL']
+    return response
+
 @app.route('/check_db')
 def check_db():
     try:
@@ -350,30 +1353,13 @@ def mark_as_sold(item_id):
         # Process form data
         selling_date = datetime.strptime(request.form['selling_date'], '%Y-%m-%d').date()
         selling_price = float(request.form['selling_price'])
-        transport_cost = float(request.form.get('transport_cost', 0))
-        food_cost = float(request.form.get('food_cost', 0))
-        fuel_cost = float(request.form.get('fuel_cost', 0))
-        other_expenses = float(request.form.get('other_expenses', 0))
         
-        # Calculate profits
-        total_purchase_expenses = item.transport_cost + item.food_cost + item.fuel_cost + item.other_expenses
-        total_sale_expenses = transport_cost + food_cost + fuel_cost + other_expenses
-        
-        # Gross profit is selling price minus purchase price
-        gross_profit = selling_price - item.item_price
-        
-        # Net profit is gross profit minus all expenses (both purchase and sale expenses)
-        net_profit = gross_profit - (total_purchase_expenses + total_sale_expenses)
-        
-        # Update item
+        # Update item; the sale expenses go to the ledger next to the purchase ones
+        forget_reports(item.selling_date, selling_date)
         item.selling_date = selling_date
         item.selling_price = selling_price
-        item.transport_cost = transport_cost
-        item.food_cost = food_cost
-        item.fuel_cost = fuel_cost
-        item.other_expenses = other_expenses
-        item.gross_profit = gross_profit
-        item.net_profit = net_profit
+        # The sale form's inputs are named after the item's expense columns
+        set_expenses(item, 'sale', parse_expenses(request.form, PURCHASE_EXPENSE_COLUMNS))
         
         # Save buyer details
         item.buyer_name = request.form['buyer_name']
@@ -388,6 +1374,8 @@ def mark_as_sold(item_id):
         app.logger.debug(f"Location: {item.buyer_location}")
         app.logger.debug(f"NIC: {item.buyer_nic}")
         
+        link_parties(item)
+        refresh_profits([item.id])
         db.session.commit()
         flash('Item marked as sold successfully!', 'success')
         return redirect(url_for('index'))
@@ -407,13 +1395,14 @@ def delete_item(item_id):
         # Delete associated files
         try:
             # Delete item images
-            for image_path in json.loads(item.images):
-                full_path = os.path.join(app.config['UPLOAD_FOLDER'], image_path)
+            for image_ref in load_file_refs(item.images):
+                full_path = os.path.join(app.config['UPLOAD_FOLDER'], image_ref['link'] or '')
                 if os.path.exists(full_path):
                     os.remove(full_path)
             
             # Delete agreement image
-            agreement_path = os.path.join(app.config['UPLOAD_FOLDER'], item.agreement_image)
+            agreement_ref = load_file_ref(item.agreement_image) or {}
+            agreement_path = os.path.join(app.config['UPLOAD_FOLDER'], agreement_ref.get('link') or '')
             if os.path.exists(agreement_path):
                 os.remove(agreement_path)
             
@@ -425,6 +1414,8 @@ def delete_item(item_id):
             app.logger.error(f"Error deleting files: {str(e)}")
         
         # Delete from database
+        record_spec_changes(item.specifications, None)
+        forget_reports(item.purchase_date, item.selling_date)
         db.session.delete(item)
         db.session.commit()
         
@@ -443,7 +1434,25 @@ def edit_item(item_id):
         item = Item.query.get_or_404(item_id)
         
         if request.method == 'POST':
+            # Check changed identifiers before touching the item
+            warnings = []
+            try:
+                imei, serial_number = device_identifiers(request.form)
+                if (imei, serial_number) != (item.imei, item.serial_number):
+                    warnings = check_device(imei, serial_number, exclude_id=item.id)
+            except ValueError as e:
+                flash(str(e), 'error')
+                return redirect(url_for('edit_item', item_id=item.id))
+
+            # Upload new images and agreement before anything is written, so
+            # no write transaction is open during the uploads
+            purchase_date = datetime.strptime(request.form['purchase_date'], '%Y-%m-%d')
+            item_dir = f"{request.form['name']}_{purchase_date.strftime('%Y-%m-%d')}"
+            image_paths = save_uploads_to_drive('item_image_tokens', 'item_images', os.path.join(item_dir, 'Product images'))
+            agreement_refs = save_uploads_to_drive('agreement_image_token', 'agreement_image', os.path.join(item_dir, 'Agreement'))
+
             # Get form data
+            old_dates = (item.purchase_date, item.selling_date)
             item.name = request.form['name']
             item.item_type = request.form['item_type']
             
@@ -454,14 +1463,11 @@ def edit_item(item_id):
             item.seller_location = request.form['seller_location']
             
             # Update purchase details
-            item.purchase_date = datetime.strptime(request.form['purchase_date'], '%Y-%m-%d')
+            item.purchase_date = purchase_date
             item.item_price = float(request.form['item_price'])
             
             # Update purchase expenses
-            item.transport_cost = float(request.form.get('transport_cost', 0))
-            item.food_cost = float(request.form.get('food_cost', 0))
-            item.fuel_cost = float(request.form.get('fuel_cost', 0))
-            item.other_expenses = float(request.form.get('other_expenses', 0))
+            set_expenses(item, 'purchase', parse_expenses(request.form, PURCHASE_EXPENSE_COLUMNS))
             
             # Process specifications
             if item.item_type == 'laptop':
@@ -486,59 +1492,14 @@ def edit_item(item_id):
                     'capacity': request.form['specs[capacity]'],
                     'remarks': request.form.get('specs[remarks]', '')
                 }
+            record_spec_changes(item.specifications, canonical_specs(specs))
             item.specifications = json.dumps(specs)
             
-            # Handle new images if uploaded
-            if 'item_images' in request.files:
-                new_images = request.files.getlist('item_images')
-                if new_images and new_images[0].filename:
-                    # Create new directory for this edit
-                    item_dir = f"{item.name}_{item.purchase_date.strftime('%Y-%m-%d')}"
-                    product_images_dir = os.path.join(item_dir, 'Product images')
-                    
-                    # Save new images
-                    image_paths = []
-                    for image in new_images:
-                        if image and image.filename:
-                            # Save locally first
-                            filename = secure_filename(image.filename)
-                            local_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                            image.save(local_path)
-                            
-                            # Upload to Drive
-                            drive_path = os.path.join(product_images_dir, filename)
-                            web_link = save_to_drive(local_path, drive_path)
-                            
-                            # Clean up local file
-                            os.remove(local_path)
-                            
-                            image_paths.append(web_link)
-                    
-                    # Update images if new ones were uploaded
-                    if image_paths:
-                        item.images = json.dumps(image_paths)
-            
-            # Handle new agreement image if uploaded
-            if 'agreement_image' in request.files:
-                agreement_image = request.files['agreement_image']
-                if agreement_image and agreement_image.filename:
-                    # Create new directory for this edit
-                    item_dir = f"{item.name}_{item.purchase_date.strftime('%Y-%m-%d')}"
-                    agreement_dir = os.path.join(item_dir, 'Agreement')
-                    
-                    # Save locally first
-                    filename = secure_filename(agreement_image.filename)
-                    local_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    agreement_image.save(local_path)
-                    
-                    # Upload to Drive
-                    drive_path = os.path.join(agreement_dir, filename)
-                    agreement_link = save_to_drive(local_path, drive_path)
-                    
-                    # Clean up local file
-                    os.remove(local_path)
-                    
-                    item.agreement_image = agreement_link
+            # Replace images and the agreement if new ones were uploaded
+            if image_paths:
+                item.images = json.dumps(image_paths)
+            if agreement_refs:
+                item.agreement_image = json.dumps(agreement_refs[0])
             
             # If item is sold, update sale details
             if item.selling_price:
@@ -546,38 +1507,491 @@ def edit_item(item_id):
                 item.selling_price = float(request.form['selling_price'])
                 
                 # Update sale expenses
-                sale_transport_cost = float(request.form.get('sale_transport_cost', 0))
-                sale_food_cost = float(request.form.get('sale_food_cost', 0))
-                sale_fuel_cost = float(request.form.get('sale_fuel_cost', 0))
-                sale_other_expenses = float(request.form.get('sale_other_expenses', 0))
+                set_expenses(item, 'sale', parse_expenses(request.form, {
+                    category: f'sale_{column}' for category, column in PURCHASE_EXPENSE_COLUMNS.items()
+                }))
                 
                 # Update buyer details
                 item.buyer_name = request.form['buyer_name']
                 item.buyer_contact = request.form['buyer_contact']
                 item.buyer_location = request.form['buyer_location']
                 item.buyer_nic = request.form.get('buyer_nic')
-                
-                # Recalculate profits
-                total_purchase_expenses = item.transport_cost + item.food_cost + item.fuel_cost + item.other_expenses
-                total_sale_expenses = sale_transport_cost + sale_food_cost + sale_fuel_cost + sale_other_expenses
-                
-                item.gross_profit = item.selling_price - item.item_price
-                item.net_profit = item.gross_profit - (total_purchase_expenses + total_sale_expenses)
             
-            db.session.commit()
+            link_parties(item)
+            forget_reports(*old_dates, item.purchase_date, item.selling_date)
+            # Recalculate profits
+            refresh_profits([item.id])
+            # Set last, so the in-stock unique indexes are checked here
+            with stocking(imei, serial_number, exclude_id=item.id):
+                item.imei = imei
+                item.serial_number = serial_number
+                db.session.commit()
+            discard_claimed_uploads()
             flash('Item updated successfully!', 'success')
+            for warning in warnings:
+                flash(warning, 'warning')
             return redirect(url_for('index'))
         
         # For GET request, prepare the data for the form
         specs = json.loads(item.specifications)
-        return render_template('edit_item.html', item=item, specs=specs)
+        return render_template('edit_item.html', item=item, specs=specs, sale_expenses=item.expense_amounts('sale'))
         
+    except DuplicateDeviceError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('edit_item', item_id=item_id))
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error editing item: {str(e)}")
         flash('Error editing item. Please try again.', 'error')
         return redirect(url_for('index'))
 
+def get_selected_item_ids():
+    """Return the item ids selected in the index multi-select."""
+    return [int(item_id) for item_id in request.form.getlist('item_ids') if item_id.isdigit()]
+
+@app.route('/bulk/mark_as_sold', methods=['POST'])
+@login_required
+def bulk_mark_as_sold():
+    try:
+        item_ids = get_selected_item_ids()
+        if not item_ids:
+            flash('No items selected.', 'warning')
+            return redirect(url_for('index'))
+
+        items = Item.query.filter(Item.id.in_(item_ids), Item.selling_price.is_(None)).order_by(Item.id).all()
+        if len(items) != len(item_ids):
+            flash('Some selected items are already sold or no longer exist.', 'error')
+            return redirect(url_for('index'))
+
+        selling_date = datetime.strptime(request.form['selling_date'], '%Y-%m-%d').date()
+        selling_prices = [float(request.form[f'selling_price[{item.id}]']) for item in items]
+        split_rule = request.form.get('split_rule', 'equal')
+
+        # Split each sale expense category across the items
+        shares = {
+            column: split_amount(float(request.form.get(column, 0) or 0), selling_prices, split_rule)
+            for column in PURCHASE_EXPENSE_COLUMNS.values()
+        }
+
+        buyer = upsert_party(request.form.get('buyer_nic'), request.form['buyer_name'],
+                             request.form['buyer_contact'], request.form['buyer_location'])
+        if buyer is not None:
+            db.session.flush()
+
+        rows = []
+        expense_rows = []
+        for index, (item, selling_price) in enumerate(zip(items, selling_prices)):
+            expense_rows.extend(
+                {'item_id': item.id, 'phase': 'sale', 'category': category, 'amount': shares[column][index]}
+                for category, column in PURCHASE_EXPENSE_COLUMNS.items() if shares[column][index]
+            )
+            rows.append({
+                'id': item.id,
+                'selling_date': selling_date,
+                'selling_price': selling_price,
+                'buyer_name': request.form['buyer_name'],
+                'buyer_contact': request.form['buyer_contact'],
+                'buyer_location': request.form['buyer_location'],
+                'buyer_nic': request.form.get('buyer_nic'),
+                'buyer_id': buyer.id if buyer else None,
+            })
+
+        # One executemany UPDATE keyed on primary key, the ledger entries in
+        # one INSERT and the profits in one UPDATE, committed together
+        forget_reports(selling_date)
+        db.session.execute(db.update(Item), rows)
+        db.session.execute(db.delete(Expense).where(Expense.item_id.in_(item_ids), Expense.phase == 'sale'))
+        if expense_rows:
+            db.session.execute(db.insert(Expense), expense_rows)
+        refresh_profits(item_ids)
+        db.session.commit()
+        flash(f'{len(rows)} items marked as sold successfully!', 'success')
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error bulk marking items as sold: {str(e)}")
+        flash('Error marking items as sold. Please try again.', 'error')
+
+    return redirect(url_for('index'))
+
+@app.route('/bulk/edit', methods=['POST'])
+@login_required
+def bulk_edit():
+    try:
+        item_ids = get_selected_item_ids()
+        if not item_ids:
+            flash('No items selected.', 'warning')
+            return redirect(url_for('index'))
+
+        values = price_adjustment_values(
+            Item, request.form.get('adjustment', 'set'), float(request.form['amount'])
+        )
+        forget_item_reports(item_ids)
+        result = db.session.execute(
+            db.update(Item).where(Item.id.in_(item_ids)).values(**values)
+        )
+        refresh_profits(item_ids)
+        db.session.commit()
+        flash(f'{result.rowcount} items updated successfully!', 'success')
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error bulk editing items: {str(e)}")
+        flash('Error updating items. Please try again.', 'error')
+
+    return redirect(url_for('index'))
+
+@app.route('/bulk/delete', methods=['POST'])
+@login_required
+def bulk_delete():
+    try:
+        item_ids = get_selected_item_ids()
+        if not item_ids:
+            flash('No items selected.', 'warning')
+            return redirect(url_for('index'))
+
+        for specs in db.session.scalars(db.select(Item.specifications).where(Item.id.in_(item_ids))):
+            record_spec_changes(specs, None)
+        forget_item_reports(item_ids)
+        db.session.execute(db.delete(Expense).where(Expense.item_id.in_(item_ids)))
+        result = db.session.execute(db.delete(Item).where(Item.id.in_(item_ids)))
+        db.session.commit()
+        flash(f'{result.rowcount} items deleted successfully!', 'success')
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error bulk deleting items: {str(e)}")
+        flash('Error deleting items. Please try again.', 'error')
+
+    return redirect(url_for('index'))
+
+# JSON API (v1) for mobile clients
+
+API_REQUIRED_FIELDS = [
+    'name', 'item_type', 'purchase_date', 'seller_name', 'seller_nic',
+    'seller_contact', 'seller_location', 'item_price', 'specifications'
+]
+
+API_UPDATABLE_FIELDS = [
+    'name', 'item_type', 'purchase_date', 'seller_name', 'seller_nic',
+    'seller_contact', 'seller_location', 'item_price', 'transport_cost',
+    'food_cost', 'fuel_cost', 'other_expenses', 'specifications',
+    'selling_date', 'selling_price', 'buyer_name', 'buyer_nic',
+    'buyer_contact', 'buyer_location', 'imei', 'serial_number'
+]
+
+def api_error(message, status=400):
+    return jsonify({'error': message}), status
+
+def api_response(data, status=200):
+    """Build a JSON response that honours If-None-Match."""
+    response = jsonify(data)
+    response.status_code = status
+    if status == 200:
+        response.add_etag()
+        response = response.make_conditional(request)
+    return response
+
+def get_api_item(item_id):
+    return db.session.get(Item, item_id)
+
+@app.route('/api/v1/items', methods=['GET'])
+@login_required
+def api_list_items():
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        limit = parse_limit(request.args.get('limit'))
+        sold = parse_bool(request.args.get('sold'))
+        purchased_from = parse_date(request.args.get('purchased_from'))
+        purchased_to = parse_date(request.args.get('purchased_to'))
+        sold_from = parse_date(request.args.get('sold_from'))
+        sold_to = parse_date(request.args.get('sold_to'))
+        updated_since = parse_datetime(request.args.get('updated_since'))
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return api_error(str(e))
+
+    query = Item.query
+    if request.args.get('type'):
+        query = query.filter(Item.item_type == request.args['type'])
+    if sold is True:
+        query = query.filter(Item.selling_price.isnot(None))
+    elif sold is False:
+        query = query.filter(Item.selling_price.is_(None))
+    if purchased_from:
+        query = query.filter(Item.purchase_date >= purchased_from)
+    if purchased_to:
+        query = query.filter(Item.purchase_date <= purchased_to)
+    if sold_from:
+        query = query.filter(Item.selling_date >= sold_from)
+    if sold_to:
+        query = query.filter(Item.selling_date <= sold_to)
+    if updated_since:
+        query = query.filter(Item.updated_at > updated_since)
+    # All purchases from / sales to one party, through the indexed foreign keys
+    for role, column in (('seller', Item.seller_id), ('buyer', Item.buyer_id)):
+        if request.args.get(f'{role}_id'):
+            query = query.filter(column == request.args.get(f'{role}_id', type=int))
+        if request.args.get(f'{role}_nic'):
+            party_id = db.select(Party.id).where(Party.nic == normalize_nic(request.args[f'{role}_nic']))
+            query = query.filter(column == party_id.scalar_subquery())
+    if after:
+        # Keyset pagination on the same ordering as the index page
+        purchase_date, item_id = after
+        query = query.filter(db.or_(
+            Item.purchase_date < purchase_date,
+            db.and_(Item.purchase_date == purchase_date, Item.id < item_id)
+        ))
+
+    items = query.order_by(Item.purchase_date.desc(), Item.id.desc()).limit(limit + 1).all()
+    has_more = len(items) > limit
+    items = items[:limit]
+
+    return api_response({
+        'items': [serialize_item(item, fields) for item in items],
+        'next_cursor': encode_cursor(items[-1]) if has_more else None
+    })
+
+@app.route('/api/v1/items/<int:item_id>', methods=['GET'])
+@login_required
+def api_get_item(item_id):
+    item = get_api_item(item_id)
+    if item is None:
+        return api_error('Item not found', 404)
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return api_error(str(e))
+    return api_response(serialize_item(item, fields))
+
+@app.route('/api/v1/items', methods=['POST'])
+@login_required
+def api_create_item():
+    data = request.get_json(silent=True) or {}
+    missing = [field for field in API_REQUIRED_FIELDS if data.get(field) in (None, '')]
+    if missing:
+        return api_error(f"Missing fields: {', '.join(missing)}")
+
+    try:
+        expenses = data.get('expenses', {})
+        imei, serial_number = device_identifiers(data)
+        warnings = check_device(imei, serial_number)
+        new_item = Item(
+            name=data['name'],
+            item_type=data['item_type'],
+            seller_name=data['seller_name'],
+            seller_nic=data['seller_nic'],
+            seller_contact=data['seller_contact'],
+            seller_location=data['seller_location'],
+            purchase_date=parse_date(data['purchase_date']),
+            item_price=float(data['item_price']),
+            specifications=json.dumps(canonical_specs(dict(data['specifications']))),
+            imei=imei,
+            serial_number=serial_number,
+            images=json.dumps([load_file_ref(ref) for ref in data.get('images', [])]),
+            agreement_image=json.dumps(load_file_ref(data['agreement_image'])) if data.get('agreement_image') else ''
+        )
+        set_expenses(new_item, 'purchase', parse_expenses(expenses))
+    except DuplicateDeviceError as e:
+        return api_error(str(e), 409)
+    except (ValueError, TypeError, AttributeError) as e:
+        return api_error(f'Invalid item data: {str(e)}')
+
+    try:
+        with stocking(imei, serial_number):
+            link_parties(new_item)
+            record_spec_changes(None, new_item.specifications)
+            forget_reports(new_item.purchase_date)
+            db.session.add(new_item)
+            db.session.commit()
+    except DuplicateDeviceError as e:
+        return api_error(str(e), 409)
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error adding item via API: {str(e)}")
+        return api_error('Error adding item', 500)
+
+    data = serialize_item(new_item)
+    data['warnings'] = warnings
+    return api_response(data, 201)
+
+@app.route('/api/v1/items/<int:item_id>/sell', methods=['POST'])
+@login_required
+def api_sell_item(item_id):
+    item = get_api_item(item_id)
+    if item is None:
+        return api_error('Item not found', 404)
+
+    data = request.get_json(silent=True) or {}
+    missing = [field for field in ('selling_date', 'selling_price', 'buyer_name', 'buyer_contact', 'buyer_location')
+               if data.get(field) in (None, '')]
+    if missing:
+        return api_error(f"Missing fields: {', '.join(missing)}")
+
+    try:
+        selling_date = parse_date(data['selling_date'])
+        selling_price = float(data['selling_price'])
+        expenses = parse_expenses(data.get('expenses', {}))
+    except (ValueError, TypeError, AttributeError) as e:
+        return api_error(f'Invalid sale data: {str(e)}')
+
+    try:
+        # Same bookkeeping as mark_as_sold
+        forget_reports(item.selling_date, selling_date)
+        item.selling_date = selling_date
+        item.selling_price = selling_price
+        set_expenses(item, 'sale', expenses)
+        item.buyer_name = data['buyer_name']
+        item.buyer_contact = data['buyer_contact']
+        item.buyer_location = data['buyer_location']
+        item.buyer_nic = data.get('buyer_nic')
+        link_parties(item)
+        refresh_profits([item.id])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error marking item as sold via API: {str(e)}")
+        return api_error('Error marking item as sold', 500)
+
+    return api_response(serialize_item(item))
+
+@app.route('/api/v1/items/<int:item_id>', methods=['PATCH'])
+@login_required
+def api_update_item(item_id):
+    item = get_api_item(item_id)
+    if item is None:
+        return api_error('Item not found', 404)
+
+    data = request.get_json(silent=True) or {}
+    unknown = [field for field in data if field not in API_UPDATABLE_FIELDS + ['sale_expenses']]
+    if unknown:
+        return api_error(f"Fields cannot be updated: {', '.join(unknown)}")
+    # Required fields can be changed but not cleared
+    cleared = [field for field in API_REQUIRED_FIELDS if field in data and data[field] in (None, '')]
+    if cleared:
+        return api_error(f"Fields cannot be empty: {', '.join(cleared)}")
+
+    old_dates = (item.purchase_date, item.selling_date)
+    try:
+        imei, serial_number = item.imei, item.serial_number
+        if 'imei' in data or 'serial_number' in data:
+            imei, serial_number = device_identifiers({
+                'imei': data.get('imei', item.imei),
+                'serial_number': data.get('serial_number', item.serial_number),
+            })
+            check_device(imei, serial_number, exclude_id=item.id)
+            data.update(imei=imei, serial_number=serial_number)
+        # New identifiers can collide with a concurrent intake at any flush below
+        with stocking(imei, serial_number, exclude_id=item.id):
+            for field in API_UPDATABLE_FIELDS:
+                if field not in data:
+                    continue
+                value = data[field]
+                if field in ('purchase_date', 'selling_date'):
+                    value = parse_date(value)
+                elif field in ('item_price', 'selling_price'):
+                    value = float(value)
+                elif field in PURCHASE_EXPENSE_COLUMNS.values():
+                    continue  # Booked in the ledger below
+                elif field == 'specifications':
+                    value = json.dumps(canonical_specs(dict(value)))
+                    record_spec_changes(item.specifications, value)
+                setattr(item, field, value)
+            changed = {category: column for category, column in PURCHASE_EXPENSE_COLUMNS.items() if column in data}
+            if changed:
+                purchase_expenses = item.expense_amounts('purchase')
+                purchase_expenses.update(
+                    (category, round(float(data[column] or 0), 2)) for category, column in changed.items()
+                )
+                set_expenses(item, 'purchase', purchase_expenses)
+            if 'sale_expenses' in data:
+                set_expenses(item, 'sale', parse_expenses(data['sale_expenses']))
+
+            link_parties(item)
+            forget_reports(*old_dates, item.purchase_date, item.selling_date)
+            refresh_profits([item.id])
+            db.session.commit()
+    except DuplicateDeviceError as e:
+        db.session.rollback()
+        return api_error(str(e), 409)
+    except (ValueError, TypeError, AttributeError) as e:
+        db.session.rollback()
+        return api_error(f'Invalid item data: {str(e)}')
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error editing item via API: {str(e)}")
+        return api_error('Error editing item', 500)
+
+    return api_response(serialize_item(item))
+
+@app.route('/api/v1/parties', methods=['GET'])
+@login_required
+def api_autocomplete_parties():
+    """Sellers and buyers whose name, NIC or contact starts with q."""
+    q = request.args.get('q', '').strip()
+    if not q:
+        return api_error('q is required')
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or list(AUTOCOMPLETE_FIELDS)
+    limit = min(max(request.args.get('limit', DEFAULT_AUTOCOMPLETE_LIMIT, type=int), 1), MAX_AUTOCOMPLETE_LIMIT)
+    try:
+        ranges = autocomplete_ranges(Party, q, fields)
+    except ValueError as e:
+        return api_error(str(e))
+
+    # The first matches of each field, read in its index order without a
+    # sort, merged by name
+    parties = {}
+    for column, condition in ranges:
+        for party in Party.query.filter(condition).order_by(column).limit(limit):
+            parties.setdefault(party.id, party)
+    matches = list(parties.values())
+    if len(ranges) > 1:
+        matches = sorted(matches, key=lambda party: (party.name.lower(), party.id))[:limit]
+    return api_response({'parties': [party.to_dict() for party in matches]})
+
+@app.route('/api/v1/devices/check', methods=['GET'])
+@login_required
+def api_check_device():
+    """Items and blocklist entries matching an imei and/or serial_number, for the intake form."""
+    try:
+        imei, serial_number = device_identifiers(request.args)
+    except ValueError as e:
+        return api_error(str(e))
+    exclude_id = request.args.get('exclude_id', type=int)
+    items, blocked = identifier_matches(imei, serial_number, exclude_id)
+    return api_response({
+        'imei': imei,
+        'serial_number': serial_number,
+        'blocked': blocked,
+        'items': [serialize_item(item, ['id', 'name', 'seller_name', 'purchase_date', 'selling_date', 'sold']) for item in items],
+    })
+
+@app.route('/api/v1/specs/<field>', methods=['GET'])
+@login_required
+def api_autocomplete_specs(field):
+    """Most used values of a spec field with a word starting with q."""
+    limit = min(max(request.args.get('limit', DEFAULT_COMPLETION_LIMIT, type=int), 1), MAX_COMPLETION_LIMIT)
+    try:
+        values = spec_vocabulary.complete(field, request.args.get('q', ''), limit)
+    except ValueError as e:
+        return api_error(str(e), 404)
+    return api_response({'field': field, 'values': values})
+
+@app.route('/api/v1/items/<int:item_id>', methods=['DELETE'])
+@login_required
+def api_delete_item(item_id):
+    item = get_api_item(item_id)
+    if item is None:
+        return api_error('Item not found', 404)
+    try:
+        record_spec_changes(item.specifications, None)
+        forget_reports(item.purchase_date, item.selling_date)
+        db.session.delete(item)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error deleting item via API: {str(e)}")
+        return api_error('Error deleting item', 500)
+    return '', 204
+
 @app.route('/forgot_password', methods=['GET', 'POST'])
 def forgot_password():
     if current_user.is_authenticated:
@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+
+# Hash length used in fingerprinted file names (css/base.<hash>.css)
+HASH_LENGTH = 12
+
+# Asset types worth compressing ahead of time
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+
+# Response types compressed on the fly
+COMPRESSIBLE_MIMETYPES = ('text/html', 'application/json')
+
+# Smaller bodies are not worth the compression overhead
+MIN_COMPRESS_SIZE = 500
+
+ASSET_URL_RE = re.compile(r"asset_url\(\s*['\"]([^'\"]+)['\"]\s*\)")
+
+
+def file_digest(path):
+    """Return the content hash used to fingerprint an asset."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            sha.update(chunk)
+    return sha.hexdigest()[:HASH_LENGTH]
+
+
+def fingerprint_name(filename, digest):
+    """css/base.css -> css/base.<digest>.css"""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest}{ext}"
+
+
+def iter_assets(static_dir):
+    """Yield source asset paths relative to static_dir, skipping build output."""
+    for root, _, files in os.walk(static_dir):
+        for name in files:
+            if name == MANIFEST_NAME or name.endswith(('.gz', '.br')):
+                continue
+            yield os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, '/')
+
+
+def build_manifest(static_dir):
+    """Map every asset to its fingerprinted name."""
+    return {
+        filename: fingerprint_name(filename, file_digest(os.path.join(static_dir, filename)))
+        for filename in sorted(iter_assets(static_dir))
+    }
+
+
+def load_manifest(static_dir):
+    """Load the manifest written by the build step, or hash assets now."""
+    path = os.path.join(static_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return build_manifest(static_dir)
+
+
+def write_manifest(static_dir, manifest):
+    with open(os.path.join(static_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def precompress_assets(static_dir, manifest):
+    """Write .gz (and .br when Brotli is installed) next to compressible assets."""
+    written = []
+    for filename in manifest:
+        if not filename.endswith(COMPRESSIBLE_EXTENSIONS):
+            continue
+        path = os.path.join(static_dir, filename)
+        with open(path, 'rb') as f:
+            data = f.read()
+        for encoding in available_encodings():
+            suffix = '.br' if encoding == 'br' else '.gz'
+            with open(path + suffix, 'wb') as f:
+                f.write(compress(data, encoding))
+            written.append(filename + suffix)
+    return written
+
+
+def referenced_assets(template_dir):
+    """Return the asset paths passed to asset_url() in the templates."""
+    assets = set()
+    for root, _, files in os.walk(template_dir):
+        for name in files:
+            if name.endswith('.html'):
+                with open(os.path.join(root, name)) as f:
+                    assets.update(ASSET_URL_RE.findall(f.read()))
+    return assets
+
+
+def verify_assets(static_dir, template_dir):
+    """Check that the manifest is current and covers every referenced asset.
+
+    Returns a list of problems; an empty list means the build is good.
+    """
+    problems = []
+    path = os.path.join(static_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return [f"{MANIFEST_NAME} not found, run the build first"]
+    with open(path) as f:
+        manifest = json.load(f)
+
+    for filename in sorted(referenced_assets(template_dir)):
+        if filename not in manifest:
+            problems.append(f"{filename} is referenced but has no fingerprint")
+    for filename, fingerprinted in sorted(manifest.items()):
+        source = os.path.join(static_dir, filename)
+        if not os.path.exists(source):
+            problems.append(f"{filename} is in the manifest but missing on disk")
+        elif fingerprint_name(filename, file_digest(source)) != fingerprinted:
+            problems.append(f"{filename} changed since the manifest was built")
+    return problems
+
+
+def negotiate_encoding(accept_encodings, choices):
+    """Pick the best encoding in choices that the client accepts, or None."""
+    for encoding in choices:
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress_response(response, accept_encodings):
+    """Compress an HTML or JSON response in place when the client accepts it."""
+    if (response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+
+    encoding = negotiate_encoding(accept_encodings, available_encodings())
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # The body differs per encoding, but the representation is the same,
+    # so the ETag stays usable for If-None-Match as a weak validator
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
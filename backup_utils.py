@@ -0,0 +1,191 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+
+# Pages copied per backup step; the source is only read-locked during a step
+PAGES_PER_STEP = 256
+
+# Seconds slept between steps so writers can take the lock
+STEP_PAUSE = 0.01
+
+# Restarts of a stepped copy (outside WAL mode) before it is finished in one step
+MAX_RESTARTS = 3
+
+MANIFEST_NAME = 'manifest.json'
+
+# Snapshots are read and compressed in blocks of this size
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class BackupError(Exception):
+    """A snapshot that failed its integrity check."""
+
+
+class _Restarted(Exception):
+    """Raised from the progress callback to abandon a stepped copy."""
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def enable_wal(connection):
+    """Switch the database to WAL mode (persistent); return whether it is in WAL mode."""
+    try:
+        return connection.execute('PRAGMA journal_mode=WAL').fetchone()[0] == 'wal'
+    except sqlite3.OperationalError:
+        # Another connection is mid-transaction; try again next time
+        return False
+
+
+def data_version(connection):
+    """SQLite's data version for this connection; it changes when another connection commits."""
+    return connection.execute('PRAGMA data_version').fetchone()[0]
+
+
+def snapshot(source, dest_path, pages=PAGES_PER_STEP, pause=STEP_PAUSE):
+    """Copy a live database to dest_path with the online backup API.
+
+    The copy runs pages at a time and sleeps pause seconds between steps.
+    In WAL mode it reads from one snapshot held open for the whole copy,
+    which never blocks writers. Otherwise writers wait for one step at
+    most, and SQLite restarts the copy when another connection commits
+    during it; after MAX_RESTARTS the copy is done in one step, which
+    writers wait for. Either way the result is consistent.
+    """
+    wal = source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    dest = sqlite3.connect(dest_path)
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise _Restarted()
+        last_remaining = remaining
+        time.sleep(pause)
+
+    try:
+        if wal:
+            source.execute('BEGIN')
+            source.execute('SELECT count(*) FROM sqlite_master').fetchone()
+        try:
+            source.backup(dest, pages=pages, progress=progress)
+        except _Restarted:
+            source.backup(dest)
+        result = dest.execute('PRAGMA quick_check').fetchone()[0]
+    finally:
+        if wal:
+            source.rollback()
+        dest.close()
+    if result != 'ok':
+        raise BackupError(f"Snapshot failed its integrity check: {result}")
+
+
+class BackupStore:
+    """Directory of compressed, checksummed database snapshots.
+
+    manifest.json lists the snapshots, newest first, with the SHA-256 of
+    each compressed file (checked by verify()) and of the database it
+    holds. A new snapshot is only kept if the data differs from the latest
+    one; only the newest keep snapshots are kept. on_remove, if given, is
+    called with the manifest entry of each snapshot rotated out, e.g. to
+    delete its uploaded copy.
+    """
+
+    def __init__(self, directory, keep=14, on_remove=None):
+        self.directory = directory
+        self.keep = keep
+        self.on_remove = on_remove
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def _manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def snapshots(self):
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def latest(self):
+        snapshots = self.snapshots()
+        return snapshots[0] if snapshots else None
+
+    def _save(self, snapshots):
+        tmp_path = self._manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshots, f, indent=2)
+        os.replace(tmp_path, self._manifest_path)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def create(self, source, prefix='business', pages=PAGES_PER_STEP, pause=STEP_PAUSE):
+        """Snapshot the source connection; return its manifest entry, or None if nothing changed."""
+        tmp_path = self.path('.snapshot.db')
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            snapshot(source, tmp_path, pages, pause)
+            data_sha256 = file_sha256(tmp_path)
+            latest = self.latest()
+            if latest and latest['data_sha256'] == data_sha256:
+                return None
+
+            created = datetime.utcnow()
+            name = f"{prefix}-{created.strftime('%Y%m%d-%H%M%S-%f')}.db.gz"
+            with open(tmp_path, 'rb') as src, gzip.open(self.path(name) + '.tmp', 'wb') as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            os.replace(self.path(name) + '.tmp', self.path(name))
+            entry = {
+                'name': name,
+                'created_at': created.isoformat(),
+                'size': os.path.getsize(self.path(name)),
+                'sha256': file_sha256(self.path(name)),
+                'data_sha256': data_sha256,
+                'drive': None,
+            }
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        snapshots = [entry] + [s for s in self.snapshots() if s['name'] != name]
+        self._save(snapshots[:self.keep])
+        for old in snapshots[self.keep:]:
+            if os.path.exists(self.path(old['name'])):
+                os.remove(self.path(old['name']))
+            if self.on_remove:
+                self.on_remove(old)
+        return entry
+
+    def mark_uploaded(self, name, file_ref):
+        snapshots = self.snapshots()
+        for entry in snapshots:
+            if entry['name'] == name:
+                entry['drive'] = file_ref
+        self._save(snapshots)
+
+    def verify(self):
+        """Yield (entry, problem or None) for each snapshot in the manifest."""
+        for entry in self.snapshots():
+            path = self.path(entry['name'])
+            if not os.path.exists(path):
+                yield entry, 'missing'
+            elif file_sha256(path) != entry['sha256']:
+                yield entry, 'checksum mismatch'
+            else:
+                yield entry, None
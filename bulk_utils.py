@@ -0,0 +1,51 @@
+from sqlalchemy import func
+
+# Ways sale expenses of a bulk sale can be shared between the items
+SPLIT_RULES = ('equal', 'price')
+
+# Ways the purchase price can be adjusted in a bulk edit
+PRICE_ADJUSTMENTS = ('set', 'add', 'percent')
+
+
+def split_amount(total, weights, rule='equal'):
+    """Split an amount across items according to a rule.
+
+    'equal' gives every item the same share, 'price' shares the amount in
+    proportion to the weights (the selling prices). Shares are rounded to
+    cents and the rounding remainder goes to the last item, so the shares
+    always add up to the total.
+    """
+    if rule not in SPLIT_RULES:
+        raise ValueError(f"Unknown split rule: {rule}")
+    count = len(weights)
+    if count == 0:
+        return []
+
+    weight_total = sum(weights)
+    if rule == 'equal' or weight_total <= 0:
+        shares = [round(total / count, 2)] * count
+    else:
+        shares = [round(total * weight / weight_total, 2) for weight in weights]
+
+    shares[-1] = round(total - sum(shares[:-1]), 2)
+    return shares
+
+
+def adjusted_price(column, mode, value):
+    """Return the SQL expression for an adjusted purchase price."""
+    if mode == 'set':
+        return value
+    if mode == 'add':
+        return column + value
+    if mode == 'percent':
+        return func.round(column * (1 + value / 100.0), 2)
+    raise ValueError(f"Unknown price adjustment: {mode}")
+
+
+def price_adjustment_values(item_model, mode, value):
+    """Build the SET clause for a bulk purchase price adjustment.
+
+    Only the price changes; profits are then recomputed from the expense
+    ledger like on every other write.
+    """
+    return {'item_price': adjusted_price(item_model.item_price, mode, value)}
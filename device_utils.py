@@ -0,0 +1,141 @@
+import csv
+import hashlib
+import os
+import threading
+from array import array
+from bisect import bisect_left
+
+# Blocklist entries are 64-bit hashes of the identifiers, kept sorted in
+# one array; the top BUCKET_BITS bits of a hash index the range to search
+KEY_TYPECODE = 'Q'
+BUCKET_BITS = 16
+
+_SEPARATORS = ' -_/.:'
+
+# What gets typed when a device has no readable serial number, after
+# normalizing; treated as no identifier at all
+PLACEHOLDERS = {'NA', 'NONE', 'NULL', 'NIL', 'UNKNOWN', 'NOSERIAL', 'NOIMEI', 'NOTAVAILABLE', 'TBA', 'TBD'}
+
+
+class DuplicateDeviceError(ValueError):
+    """A device whose IMEI or serial number is already in stock."""
+
+
+def luhn_valid(digits):
+    total = 0
+    for index, char in enumerate(reversed(digits)):
+        digit = int(char)
+        if index % 2:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return total % 10 == 0
+
+
+def normalize_serial(value):
+    """Upper-case serial number without separators, or None if empty.
+
+    Placeholders such as N/A, unknown or 0000 count as empty, so they
+    don't collide as the same device.
+    """
+    if value is None:
+        return None
+    value = ''.join(char for char in str(value).upper() if char not in _SEPARATORS and not char.isspace())
+    if not value or value in PLACEHOLDERS or len(set(value)) == 1:
+        return None
+    return value
+
+
+def normalize_imei(value):
+    """15-digit IMEI without separators, or None if empty.
+
+    Raises ValueError if it is not 15 digits or its check digit is wrong.
+    """
+    value = normalize_serial(value)
+    if value is None:
+        return None
+    if len(value) != 15 or not value.isdigit() or not luhn_valid(value):
+        raise ValueError(f"Invalid IMEI: {value}")
+    return value
+
+
+def identifier_key(value):
+    """64-bit key of a normalized IMEI or serial number."""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+def read_identifiers(lines):
+    """Yield the normalized identifiers of a blocklist source file.
+
+    Each line holds an IMEI or serial number in its first column (comma
+    separated); blank lines and lines starting with # are skipped.
+    """
+    for row in csv.reader(lines):
+        if not row or row[0].lstrip().startswith('#'):
+            continue
+        value = normalize_serial(row[0])
+        if value:
+            yield value
+
+
+class Blocklist:
+    """Blocked device identifiers, loaded from a file of sorted 64-bit keys.
+
+    The file is reloaded when it changes, so `flask import-blocklist`
+    applies to running workers. A lookup reads one bucket of the array;
+    with uniformly spread hashes a bucket holds about n / 65536 keys, so it
+    stays a few comparisons at millions of entries. Two identifiers with
+    the same 64-bit hash are indistinguishable.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._keys = array(KEY_TYPECODE)
+        self._offsets = array('L', [0] * ((1 << BUCKET_BITS) + 1))
+
+    def __len__(self):
+        self._ensure_fresh()
+        return len(self._keys)
+
+    def _ensure_fresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        keys = array(KEY_TYPECODE)
+        if mtime is not None:
+            with open(self.path, 'rb') as f:
+                keys.frombytes(f.read())
+        shift = 64 - BUCKET_BITS
+        offsets = array('L', (bisect_left(keys, bucket << shift) for bucket in range(1 << BUCKET_BITS)))
+        offsets.append(len(keys))
+        with self._lock:
+            self._keys, self._offsets, self._mtime = keys, offsets, mtime
+
+    def __contains__(self, value):
+        self._ensure_fresh()
+        key = identifier_key(value)
+        with self._lock:
+            bucket = key >> (64 - BUCKET_BITS)
+            lo, hi = self._offsets[bucket], self._offsets[bucket + 1]
+            index = bisect_left(self._keys, key, lo, hi)
+            return index < hi and self._keys[index] == key
+
+    def write(self, identifiers, replace=False):
+        """Store identifiers, merged with the current ones unless replace; return the count."""
+        keys = {identifier_key(value) for value in identifiers}
+        if not replace:
+            self._ensure_fresh()
+            keys.update(self._keys)
+        data = array(KEY_TYPECODE, sorted(keys))
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            data.tofile(f)
+        os.replace(tmp_path, self.path)
+        return len(data)
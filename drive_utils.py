@@ -1,11 +1,24 @@
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 import os
+import mimetypes
+import re
+import ssl
+import json
+import time
+import socket
+import random
 import pickle
+import hashlib
 import logging
+import threading
+import httplib2
+from profiling_utils import traced
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -14,38 +27,245 @@ logger = logging.getLogger(__name__)
 # If modifying these scopes, delete the file token.pickle.
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
 
-def get_drive_service():
-    """Get or create Google Drive service."""
-    creds = None
-    # The file token.pickle stores the user's access and refresh tokens
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
-    
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+# Retry policy for transient Drive errors: exponential backoff with full jitter
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0  # seconds
+BACKOFF_MAX = 32.0  # seconds
+RETRIABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+# Socket timeout for Drive HTTP requests
+HTTP_TIMEOUT = 60  # seconds
+
+# Resumable uploads send the file in chunks (must be a multiple of 256 KB),
+# so a failure only costs the chunk in flight
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Uploads carry this app property so a retried upload finds the first copy
+IDEMPOTENCY_PROPERTY = 'gseIdempotencyKey'
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+# Page size for Changes API and full listings (the maximum Drive allows)
+LIST_PAGE_SIZE = 1000
+CHANGE_FIELDS = 'nextPageToken, newStartPageToken, changes(fileId, removed, file(id, name, mimeType, parents, trashed))'
+FILE_LIST_FIELDS = 'nextPageToken, files(id, name, mimeType, parents, trashed)'
+
+class DriveUnavailableError(Exception):
+    """Raised without calling Drive while the circuit breaker is open."""
+
+class CircuitBreaker:
+    """Fail fast after repeated Drive failures.
+
+    After failure_threshold consecutive calls that failed with retriable
+    errors on every retry, the breaker opens and calls fail immediately
+    for reset_timeout seconds. Then one trial call is let through;
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise DriveUnavailableError('Google Drive is unavailable, please try again shortly')
+            # Half-open: let this call through as the trial and hold the others
+            self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.error(f"Drive circuit breaker opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+drive_breaker = CircuitBreaker()
+
+def is_retriable(error):
+    """Whether a Drive error is transient and the call can be retried."""
+    if isinstance(error, HttpError):
+        if error.resp.status in RETRIABLE_STATUS_CODES:
+            return True
+        if error.resp.status == 403:
+            reasons = [detail.get('reason') for detail in (error.error_details or []) if isinstance(detail, dict)]
+            return any(reason in RATE_LIMIT_REASONS for reason in reasons)
+        return False
+    return isinstance(error, (ConnectionError, TimeoutError, socket.timeout, socket.gaierror,
+                              ssl.SSLError, httplib2.ServerNotFoundError))
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff delay for a retry attempt (0-based)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def call_with_retries(func, *args, retries=MAX_RETRIES, **kwargs):
+    """Call func through the circuit breaker, retrying retriable errors.
+
+    The breaker is checked once per call, and a call counts as one failure
+    only once its retries are used up, so a single flaky call cannot open it.
+    """
+    drive_breaker.before_call()
+    for attempt in range(retries + 1):
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if not is_retriable(e):
+                # Drive answered, the request itself was wrong
+                drive_breaker.record_success()
+                raise
+            if attempt == retries:
+                drive_breaker.record_failure()
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"Retriable Drive error ({str(e)}), retrying in {delay:.1f}s")
+            time.sleep(delay)
         else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', SCOPES)
-            # Set the access type to offline and include the prompt for consent
-            creds = flow.run_local_server(
-                port=0,
-                prompt='consent',
-                authorization_prompt_message='Please authorize the application to access your Google Drive.'
-            )
-        # Save the credentials for the next run
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
-
-    return build('drive', 'v3', credentials=creds)
+            drive_breaker.record_success()
+            return result
+
+def execute(request, retries=MAX_RETRIES):
+    """Execute a Drive API request with retries and the circuit breaker."""
+    return call_with_retries(request.execute, retries=retries)
+
+# Matches the file ID in links such as https://drive.google.com/file/d/<id>/view?usp=drivesdk
+DRIVE_FILE_ID_RE = re.compile(r'/(?:file/)?d/([A-Za-z0-9_-]+)|[?&]id=([A-Za-z0-9_-]+)')
+
+def parse_file_id(link):
+    """Extract the Drive file ID from a webViewLink, or None."""
+    match = DRIVE_FILE_ID_RE.search(link or '')
+    if not match:
+        return None
+    return match.group(1) or match.group(2)
 
+def make_file_ref(file_id, link, mime_type=None, size=None):
+    """Build the structured reference stored for an uploaded file."""
+    return {
+        'id': file_id,
+        'mime_type': mime_type,
+        'size': int(size) if size is not None else None,
+        'link': link
+    }
+
+def file_ref_from_link(link):
+    """Build a file reference for a legacy webViewLink string."""
+    return make_file_ref(parse_file_id(link), link)
+
+def load_file_ref(value):
+    """Decode a stored file reference; legacy plain links are converted."""
+    if isinstance(value, dict):
+        return value
+    if not value:
+        return None
+    try:
+        ref = json.loads(value)
+    except ValueError:
+        return file_ref_from_link(value)
+    return ref if isinstance(ref, dict) else file_ref_from_link(value)
+
+def load_file_refs(value):
+    """Decode a stored JSON list of file references."""
+    try:
+        refs = json.loads(value) if value else []
+    except ValueError:
+        return []
+    return [ref if isinstance(ref, dict) else file_ref_from_link(ref) for ref in refs]
+
+# Credentials are shared by all threads; HTTP transports are not
+_credentials = None
+_credentials_lock = threading.Lock()
+
+# Per-thread Drive service. Under gevent, threading.local is patched to be
+# greenlet-local, so each greenlet gets its own service as well.
+_local = threading.local()
+
+def get_credentials():
+    """Load, refresh or obtain the OAuth credentials, once per process."""
+    global _credentials
+    with _credentials_lock:
+        creds = _credentials
+        # The file token.pickle stores the user's access and refresh tokens
+        if creds is None and os.path.exists('token.pickle'):
+            with open('token.pickle', 'rb') as token:
+                creds = pickle.load(token)
+        
+        # If there are no (valid) credentials available, let the user log in.
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    'credentials.json', SCOPES)
+                # Set the access type to offline and include the prompt for consent
+                creds = flow.run_local_server(
+                    port=0,
+                    prompt='consent',
+                    authorization_prompt_message='Please authorize the application to access your Google Drive.'
+                )
+            # Save the credentials for the next run
+            with open('token.pickle', 'wb') as token:
+                pickle.dump(creds, token)
+
+        _credentials = creds
+        return creds
+
+@traced('drive')
+def get_drive_service():
+    """Get the Google Drive service for the current thread.
+
+    httplib2 connections are not thread-safe, so each thread gets its own
+    service with its own HTTP transport, built once and then reused.
+    """
+    creds = get_credentials()
+    service = getattr(_local, 'service', None)
+    if service is None:
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+        service = build('drive', 'v3', http=http, cache_discovery=False)
+        _local.http = http
+        _local.service = service
+    return service
+
+def get_drive_http():
+    """The current thread's authorized HTTP transport, for plain GETs of Drive links."""
+    get_drive_service()
+    return _local.http
+
+def fetch(link):
+    """GET a Drive link with the thread's transport; raises HttpError on retriable statuses."""
+    response, content = get_drive_http().request(link)
+    if response.status in RETRIABLE_STATUS_CODES:
+        raise HttpError(response, content, uri=link)
+    return response, content
+
+@traced('drive')
 def get_gse_folder_id(service):
     """Get the ID of the GSE folder in Google Drive."""
-    # Search for the GSE folder
+    return call_with_retries(find_or_create_folder, service, 'GSE')
+
+def find_or_create_folder(service, folder_name, parent_id=None):
+    """Return the ID of a folder, creating it if it does not exist.
+
+    Retrying this as a whole is safe: if a create succeeded but its
+    response was lost, the retry finds the folder instead of creating
+    a second one.
+    """
+    query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder'"
+    if parent_id:
+        query += f" and '{parent_id}' in parents"
+
     results = service.files().list(
-        q="name='GSE' and mimeType='application/vnd.google-apps.folder'",
+        q=query,
         spaces='drive',
         fields='files(id, name)'
     ).execute()
@@ -53,12 +273,13 @@ def get_gse_folder_id(service):
     items = results.get('files', [])
     
     if items:
-        # GSE folder exists, return its ID
+        # Folder exists, use its ID
         return items[0]['id']
     else:
-        # Create GSE folder
-        return create_folder(service, 'GSE')
+        # Create new folder
+        return create_folder(service, folder_name, parent_id)
 
+@traced('drive')
 def create_folder(service, folder_name, parent_id=None):
     """Create a folder in Google Drive."""
     file_metadata = {
@@ -76,56 +297,105 @@ def create_folder(service, folder_name, parent_id=None):
     logger.debug(f"Created folder {folder_name} with ID: {file.get('id')}")
     return file.get('id')
 
-def upload_file(service, file_path, folder_id=None):
-    """Upload a file to Google Drive."""
-    file_name = os.path.basename(file_path)
-    file_metadata = {'name': file_name}
+def make_idempotency_key(file_path, folder_id=None):
+    """Derive an upload's idempotency key from its content and destination.
+
+    Re-submitting the same image to the same folder yields the same key,
+    so the upload is recognised as already done.
+    """
+    sha = hashlib.sha256((folder_id or '').encode())
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def find_uploaded_file(service, idempotency_key):
+    """Return a file previously uploaded with this idempotency key, or None."""
+    results = execute(service.files().list(
+        q=f"appProperties has {{ key='{IDEMPOTENCY_PROPERTY}' and value='{idempotency_key}' }} and trashed=false",
+        spaces='drive',
+        fields='files(id, mimeType, size, webViewLink)'
+    ))
+    files = results.get('files', [])
+    return files[0] if files else None
+
+@traced('drive')
+def upload_file(service, file_path, folder_id=None, idempotency_key=None, file_name=None):
+    """Upload a file to Google Drive.
+
+    The upload is resumable and sent in chunks; a failed chunk is retried
+    and the session resumes from the last byte Drive acknowledged. If a
+    file with the same idempotency key already exists it is returned
+    instead of uploading a duplicate. The Drive file is named file_name,
+    or after the local file when it is not given.
+    """
+    file_name = file_name or os.path.basename(file_path)
+    if idempotency_key is None:
+        idempotency_key = make_idempotency_key(file_path, folder_id)
+
+    existing = find_uploaded_file(service, idempotency_key)
+    if existing:
+        logger.debug(f"File {file_name} already uploaded with ID: {existing.get('id')}")
+        return make_file_ref(existing.get('id'), existing.get('webViewLink'), existing.get('mimeType'), existing.get('size'))
+
+    file_metadata = {
+        'name': file_name,
+        'appProperties': {IDEMPOTENCY_PROPERTY: idempotency_key}
+    }
     if folder_id:
         file_metadata['parents'] = [folder_id]
 
     media = MediaFileUpload(
         file_path,
+        mimetype=mimetypes.guess_type(file_name)[0],
+        chunksize=UPLOAD_CHUNK_SIZE,
         resumable=True
     )
 
-    file = service.files().create(
+    request = service.files().create(
         body=file_metadata,
         media_body=media,
-        fields='id, webViewLink'
-    ).execute()
+        fields='id, mimeType, size, webViewLink'
+    )
+
+    # After a failed chunk, next_chunk() asks Drive how much it received
+    # and continues from there
+    file = None
+    while file is None:
+        status, file = call_with_retries(request.next_chunk)
+        if status:
+            logger.debug(f"Uploading {file_name}: {int(status.progress() * 100)}%")
     
     logger.debug(f"Uploaded file {file_name} with ID: {file.get('id')}")
-    return file.get('id'), file.get('webViewLink')
+    return make_file_ref(file.get('id'), file.get('webViewLink'), file.get('mimeType'), file.get('size'))
+
+@traced('drive')
+def get_or_create_folder_structure(service, path_parts, folder_map=None):
+    """Create a folder structure in Google Drive and return the final folder ID.
 
-def get_or_create_folder_structure(service, path_parts):
-    """Create a folder structure in Google Drive and return the final folder ID."""
+    With a folder_map (lookup(parent_id, name), remember(folder_id, name,
+    parent_id) and forget(folder_id), which drops the folder and its
+    ancestors), folders already known are resolved without calling Drive.
+    """
     # Get the GSE folder ID as the root
-    current_parent_id = get_gse_folder_id(service)
-    
+    current_parent_id = folder_map.lookup(None, 'GSE') if folder_map else None
+    if current_parent_id is None:
+        current_parent_id = get_gse_folder_id(service)
+        if folder_map:
+            folder_map.remember(current_parent_id, 'GSE', None)
+
     for folder_name in path_parts:
-        # Search for the folder in the current parent
-        query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder'"
-        if current_parent_id:
-            query += f" and '{current_parent_id}' in parents"
-        
-        results = service.files().list(
-            q=query,
-            spaces='drive',
-            fields='files(id, name)'
-        ).execute()
-        
-        items = results.get('files', [])
-        
-        if items:
-            # Folder exists, use its ID
-            current_parent_id = items[0]['id']
-        else:
-            # Create new folder
-            current_parent_id = create_folder(service, folder_name, current_parent_id)
+        folder_id = folder_map.lookup(current_parent_id, folder_name) if folder_map else None
+        if folder_id is None:
+            # Find or create the folder in the current parent
+            folder_id = call_with_retries(find_or_create_folder, service, folder_name, current_parent_id)
+            if folder_map:
+                folder_map.remember(folder_id, folder_name, current_parent_id)
+        current_parent_id = folder_id
     
     return current_parent_id
 
-def save_to_drive(local_path, drive_path):
+def save_to_drive(local_path, drive_path, folder_map=None):
     """Save a file to Google Drive maintaining the same folder structure."""
     try:
         service = get_drive_service()
@@ -136,14 +406,188 @@ def save_to_drive(local_path, drive_path):
         folder_parts = path_parts[:-1]
         
         # Create folder structure and get the parent folder ID
-        parent_id = get_or_create_folder_structure(service, folder_parts)
+        parent_id = get_or_create_folder_structure(service, folder_parts, folder_map)
         
         # Upload the file
-        file_id, web_link = upload_file(service, local_path, parent_id)
+        try:
+            file_ref = upload_file(service, local_path, parent_id, file_name=file_name)
+        except HttpError as e:
+            # A mapped folder was deleted since the last reconciliation:
+            # resolve the path through Drive again
+            if folder_map is None or e.resp.status != 404:
+                raise
+            folder_map.forget(parent_id)
+            parent_id = get_or_create_folder_structure(service, folder_parts, folder_map)
+            file_ref = upload_file(service, local_path, parent_id, file_name=file_name)
         
-        logger.debug(f"File saved to Drive: {web_link}")
-        return web_link
+        logger.debug(f"File saved to Drive: {file_ref['link']}")
+        return file_ref
         
     except Exception as e:
         logger.error(f"Error saving to Drive: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
+
+@traced('drive')
+def get_thumbnail(file_id, size=220):
+    """Download the Drive thumbnail of a file.
+
+    Returns the image bytes, or None when Drive has no thumbnail for it.
+    """
+    service = get_drive_service()
+    file = execute(service.files().get(fileId=file_id, fields='thumbnailLink'))
+    link = file.get('thumbnailLink')
+    if not link:
+        return None
+
+    # thumbnailLink ends with a size suffix such as =s220
+    link = re.sub(r'=s\d+$', f'=s{size}', link)
+    response, content = call_with_retries(fetch, link)
+    if response.status != 200:
+        logger.error(f"Error fetching thumbnail for {file_id}: HTTP {response.status}")
+        return None
+    return content
+
+@traced('drive')
+def delete_file(file_id):
+    """Delete a Drive file; one that is already gone counts as deleted."""
+    service = get_drive_service()
+    try:
+        execute(service.files().delete(fileId=file_id))
+    except HttpError as e:
+        if e.resp.status != 404:
+            raise
+
+@traced('drive')
+def get_start_page_token(service):
+    """Return the Changes API token for changes made from now on."""
+    return execute(service.changes().getStartPageToken())['startPageToken']
+
+@traced('drive')
+def list_changes(service, page_token):
+    """Return (changes since page_token, token to start from next time)."""
+    changes = []
+    while True:
+        response = execute(service.changes().list(
+            pageToken=page_token,
+            spaces='drive',
+            includeRemoved=True,
+            pageSize=LIST_PAGE_SIZE,
+            fields=CHANGE_FIELDS
+        ))
+        changes.extend(response.get('changes', []))
+        if 'newStartPageToken' in response:
+            return changes, response['newStartPageToken']
+        page_token = response['nextPageToken']
+
+@traced('drive')
+def list_all_files(service):
+    """List every file and folder the app can see that is not trashed."""
+    files = []
+    page_token = None
+    while True:
+        response = execute(service.files().list(
+            q='trashed=false',
+            spaces='drive',
+            pageSize=LIST_PAGE_SIZE,
+            pageToken=page_token,
+            fields=FILE_LIST_FIELDS
+        ))
+        files.extend(response.get('files', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return files
+
+def _folder_entry(file):
+    parent = (file.get('parents') or [None])[0]
+    return {'name': file.get('name'), 'parent': parent}
+
+def _is_folder(file):
+    return file.get('mimeType') == FOLDER_MIME_TYPE
+
+def reconcile_drive(service, start_page_token, folders, referenced_ids):
+    """Compare Drive with the file references stored in the database.
+
+    folders is the folder-ID mapping {folder_id: {'name', 'parent'}} and is
+    updated in place; folders whose parent the app cannot see (such as GSE
+    in My Drive) get parent None. With a start_page_token only the changes
+    since the last run are fetched; without one (first run) everything the
+    app can see is listed once and the mapping is rebuilt.
+
+    Returns a report dict:
+        start_page_token  token to persist for the next run
+        full_scan         whether everything was listed
+        changes           number of changes (or files) processed
+        broken            referenced file IDs that were deleted or trashed
+        restored          referenced file IDs that are present again
+        orphans           {file_id: name} of files in the app's folders that
+                          nothing references
+        removed           file IDs that are gone from Drive
+        renamed_folders   (folder_id, old_name, new_name) tuples
+    """
+    report = {
+        'full_scan': start_page_token is None,
+        'broken': set(),
+        'restored': set(),
+        'orphans': {},
+        'removed': set(),
+        'renamed_folders': [],
+    }
+
+    if start_page_token is None:
+        # Take the token first so nothing changed during the listing is missed
+        report['start_page_token'] = get_start_page_token(service)
+        files = list_all_files(service)
+        report['changes'] = len(files)
+        folders.clear()
+        folders.update((file['id'], _folder_entry(file)) for file in files if _is_folder(file))
+        changed_folders = list(folders)
+        present = set()
+        for file in files:
+            if _is_folder(file):
+                continue
+            present.add(file['id'])
+            if file['id'] not in referenced_ids and set(file.get('parents') or []) & folders.keys():
+                report['orphans'][file['id']] = file.get('name')
+        report['broken'] = set(referenced_ids) - present
+    else:
+        changes, report['start_page_token'] = list_changes(service, start_page_token)
+        report['changes'] = len(changes)
+
+        # Folders first, so files in a folder created in the same batch are in scope
+        changed_folders = []
+        for change in changes:
+            file_id = change['fileId']
+            file = change.get('file') or {}
+            if not (_is_folder(file) or file_id in folders):
+                continue
+            if change.get('removed') or file.get('trashed'):
+                folders.pop(file_id, None)
+                continue
+            old = folders.get(file_id)
+            if old and old['name'] != file.get('name'):
+                report['renamed_folders'].append((file_id, old['name'], file.get('name')))
+            folders[file_id] = _folder_entry(file)
+            changed_folders.append(file_id)
+
+        for change in changes:
+            file_id = change['fileId']
+            file = change.get('file') or {}
+            if _is_folder(file) or file_id in folders:
+                continue
+            if change.get('removed') or file.get('trashed'):
+                report['removed'].add(file_id)
+                report['orphans'].pop(file_id, None)
+                report['restored'].discard(file_id)
+                if file_id in referenced_ids:
+                    report['broken'].add(file_id)
+            elif file_id in referenced_ids:
+                report['broken'].discard(file_id)
+                report['restored'].add(file_id)
+            elif set(file.get('parents') or []) & folders.keys():
+                report['orphans'][file_id] = file.get('name')
+
+    for folder_id in changed_folders:
+        entry = folders.get(folder_id)
+        if entry and entry['parent'] not in folders:
+            entry['parent'] = None
+    return report
@@ -0,0 +1,50 @@
+from sqlalchemy import case, func, select
+
+# An item's expenses are booked when it is bought and when it is sold
+EXPENSE_PHASES = ('purchase', 'sale')
+EXPENSE_CATEGORIES = ('transport', 'food', 'fuel', 'other')
+
+# Item columns that mirror the purchase expenses of each category
+PURCHASE_EXPENSE_COLUMNS = {
+    'transport': 'transport_cost',
+    'food': 'food_cost',
+    'fuel': 'fuel_cost',
+    'other': 'other_expenses',
+}
+
+
+def parse_expenses(source, fields='{category}'):
+    """Read {category: amount} from a form or dict.
+
+    fields names the field of each category: a format string such as
+    'expenses[{category}]', or a {category: field} dict.
+    """
+    if isinstance(fields, str):
+        fields = {category: fields.format(category=category) for category in EXPENSE_CATEGORIES}
+    return {
+        category: round(float(source.get(fields[category], 0) or 0), 2)
+        for category in EXPENSE_CATEGORIES
+    }
+
+
+def expense_total(expense_model, item_id, phase=None):
+    """SQL subquery summing an item's ledger entries, optionally of one phase."""
+    query = select(func.total(expense_model.amount)).where(expense_model.item_id == item_id)
+    if phase is not None:
+        query = query.where(expense_model.phase == phase)
+    return query.scalar_subquery()
+
+
+def profit_values(item_model, expense_model):
+    """Build the SET clause deriving an item's profits from the ledger.
+
+    Gross profit is the selling price less the purchase price; net profit
+    also takes off every expense of both phases. Unsold items have none.
+    """
+    sold = item_model.selling_price.isnot(None)
+    gross_profit = func.round(item_model.selling_price - item_model.item_price, 2)
+    return {
+        'selling_expenses': expense_total(expense_model, item_model.id, 'sale'),
+        'gross_profit': case((sold, gross_profit), else_=None),
+        'net_profit': case((sold, func.round(gross_profit - expense_total(expense_model, item_model.id), 2)), else_=None),
+    }
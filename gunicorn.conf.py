@@ -0,0 +1,41 @@
+# Gunicorn profile for GSE App.
+#
+# Requests spend most of their time waiting on Google Drive, so workers are
+# sized for I/O rather than CPU. The default gthread workers run several
+# threads per process; each thread gets its own Drive HTTP transport (see
+# drive_utils.get_drive_service). Set GUNICORN_WORKER_CLASS=gevent (with
+# gevent installed) for many more concurrent uploads per process.
+#
+#   gunicorn -c gunicorn.conf.py app:app
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+# SQLite allows one writer at a time, so a few processes with many threads
+# each work better than many single-threaded processes
+workers = int(os.getenv('GUNICORN_WORKERS', min(multiprocessing.cpu_count(), 4)))
+
+if worker_class == 'gthread':
+    threads = int(os.getenv('GUNICORN_THREADS', 16))
+elif worker_class == 'gevent':
+    worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 200))
+
+# Drive uploads with retries can take a while; don't kill the worker mid-upload
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 180))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth
+max_requests = 1000
+max_requests_jitter = 100
+
+# Don't load the app before forking: SQLite connections and Drive
+# transports must not be shared between worker processes
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
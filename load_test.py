@@ -0,0 +1,120 @@
+"""Load test: index browsing while Drive uploads run concurrently.
+
+Starts browser threads that fetch the index page in a loop and uploader
+threads that submit the add item form with images, then reports throughput
+and latency for each. Run it against a test instance; every upload creates
+a real item and real Drive files.
+
+    gunicorn -c gunicorn.conf.py app:app
+    python load_test.py --url http://localhost:8000 --username test --password test
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from datetime import date
+
+import requests
+
+
+def login(session, url, username, password):
+    response = session.post(f"{url}/login", data={'username': username, 'password': password})
+    if '/login' in response.url:
+        raise SystemExit('Login failed, check --username and --password')
+
+
+def browse(session, url):
+    return session.get(f"{url}/")
+
+
+def upload(session, url, images, worker, sequence):
+    form = {
+        'name': f"Load Test {worker}-{sequence}",
+        'item_type': 'smartphone',
+        'seller_name': 'Load Test',
+        'seller_nic': '000000000V',
+        'seller_contact': '0000000000',
+        'seller_location': 'Load Test',
+        'purchase_date': date.today().strftime('%Y-%m-%d'),
+        'item_price': '1',
+        'specs[model]': 'Load Test',
+        'specs[capacity]': '64GB',
+    }
+    files = [('item_images', (os.path.basename(path), open(path, 'rb'))) for path in images]
+    files.append(('agreement_image', (os.path.basename(images[0]), open(images[0], 'rb'))))
+    try:
+        return session.post(f"{url}/add_item", data=form, files=files)
+    finally:
+        for _, (_, f) in files:
+            f.close()
+
+
+def run_worker(kind, worker, args, stop, results):
+    session = requests.Session()
+    login(session, args.url, args.username, args.password)
+    sequence = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            if kind == 'browse':
+                response = browse(session, args.url)
+            else:
+                response = upload(session, args.url, args.images, worker, sequence)
+            # A failed upload redirects back to the form instead of the index
+            ok = response.status_code == 200 and not response.url.endswith('/add_item')
+        except requests.RequestException:
+            ok = False
+        results[kind].append((time.perf_counter() - start, ok))
+        sequence += 1
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1] if len(values) > 1 else values[0]
+
+
+def report(results, duration):
+    print(f"{'kind':<8} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for kind, samples in results.items():
+        latencies = [latency * 1000 for latency, _ in samples]
+        errors = sum(1 for _, ok in samples if not ok)
+        print(f"{kind:<8} {len(samples):>9} {errors:>7} {len(samples) / duration:>8.2f} "
+              f"{percentile(latencies, 50):>9.1f} {percentile(latencies, 95):>9.1f} {percentile(latencies, 99):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--browsers', type=int, default=8, help='concurrent index browsers')
+    parser.add_argument('--uploaders', type=int, default=4, help='concurrent add item uploads')
+    parser.add_argument('--duration', type=float, default=60, help='seconds to run')
+    parser.add_argument('--images', nargs='+', help='image files to upload with each item')
+    args = parser.parse_args()
+
+    if args.uploaders and not args.images:
+        parser.error('--images is required when --uploaders is not 0')
+
+    results = {'browse': [], 'upload': []}
+    stop = threading.Event()
+    threads = [threading.Thread(target=run_worker, args=('browse', i, args, stop, results))
+               for i in range(args.browsers)]
+    threads += [threading.Thread(target=run_worker, args=('upload', i, args, stop, results))
+                for i in range(args.uploaders)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    report(results, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
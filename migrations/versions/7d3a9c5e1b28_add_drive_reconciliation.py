@@ -0,0 +1,65 @@
+"""add drive reconciliation
+
+Revision ID: 7d3a9c5e1b28
+Revises: e2d84b6c0a95
+Create Date: 2026-10-19 18:24:09.731552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3a9c5e1b28'
+down_revision = 'e2d84b6c0a95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('drive_folder',
+    sa.Column('id', sa.String(length=64), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('parent_id', sa.String(length=64), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('drive_folder', schema=None) as batch_op:
+        batch_op.create_index('ix_drive_folder_parent_id_name', ['parent_id', 'name'], unique=False)
+
+    op.create_table('drive_sync_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('start_page_token', sa.String(length=64), nullable=True),
+    sa.Column('last_run_at', sa.DateTime(), nullable=True),
+    sa.Column('last_duration', sa.Float(), nullable=True),
+    sa.Column('last_changes', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('drive_issue',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('file_id', sa.String(length=64), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=True),
+    sa.Column('detail', sa.String(length=255), nullable=True),
+    sa.Column('detected_at', sa.DateTime(), nullable=True),
+    sa.Column('resolved_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['item_id'], ['item.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('drive_issue', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_drive_issue_item_id'), ['item_id'], unique=False)
+        batch_op.create_index('ix_drive_issue_resolved_at_kind', ['resolved_at', 'kind'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('drive_issue', schema=None) as batch_op:
+        batch_op.drop_index('ix_drive_issue_resolved_at_kind')
+        batch_op.drop_index(batch_op.f('ix_drive_issue_item_id'))
+
+    op.drop_table('drive_issue')
+    op.drop_table('drive_sync_state')
+    with op.batch_alter_table('drive_folder', schema=None) as batch_op:
+        batch_op.drop_index('ix_drive_folder_parent_id_name')
+
+    op.drop_table('drive_folder')
@@ -0,0 +1,89 @@
+"""store drive file references
+
+Revision ID: 8a4e6f2c1d37
+Revises: 3f1c2a7d9b10
+Create Date: 2026-10-19 11:40:05.162947
+
+"""
+import json
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e6f2c1d37'
+down_revision = '3f1c2a7d9b10'
+branch_labels = None
+depends_on = None
+
+DRIVE_FILE_ID_RE = re.compile(r'/(?:file/)?d/([A-Za-z0-9_-]+)|[?&]id=([A-Za-z0-9_-]+)')
+
+item = sa.table(
+    'item',
+    sa.column('id', sa.Integer),
+    sa.column('images', sa.Text),
+    sa.column('agreement_image', sa.Text),
+)
+
+
+def link_to_ref(link):
+    match = DRIVE_FILE_ID_RE.search(link or '')
+    file_id = (match.group(1) or match.group(2)) if match else None
+    return {'id': file_id, 'mime_type': None, 'size': None, 'link': link}
+
+
+def upgrade():
+    with op.batch_alter_table('item', schema=None) as batch_op:
+        batch_op.alter_column('agreement_image',
+               existing_type=sa.String(length=255),
+               type_=sa.Text(),
+               existing_nullable=False)
+
+    # Replace webViewLink strings with structured references
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(item.c.id, item.c.images, item.c.agreement_image)).fetchall()
+    for row in rows:
+        try:
+            images = json.loads(row.images) if row.images else []
+        except ValueError:
+            images = []
+        images = [ref if isinstance(ref, dict) else link_to_ref(ref) for ref in images]
+
+        agreement = row.agreement_image
+        if agreement and not agreement.startswith('{'):
+            agreement = json.dumps(link_to_ref(agreement))
+
+        conn.execute(
+            item.update().where(item.c.id == row.id).values(
+                images=json.dumps(images), agreement_image=agreement
+            )
+        )
+
+
+def downgrade():
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(item.c.id, item.c.images, item.c.agreement_image)).fetchall()
+    for row in rows:
+        try:
+            images = json.loads(row.images) if row.images else []
+        except ValueError:
+            images = []
+        images = [ref['link'] if isinstance(ref, dict) else ref for ref in images]
+
+        agreement = row.agreement_image
+        if agreement and agreement.startswith('{'):
+            agreement = json.loads(agreement).get('link')
+
+        conn.execute(
+            item.update().where(item.c.id == row.id).values(
+                images=json.dumps(images), agreement_image=agreement
+            )
+        )
+
+    with op.batch_alter_table('item', schema=None) as batch_op:
+        batch_op.alter_column('agreement_image',
+               existing_type=sa.Text(),
+               type_=sa.String(length=255),
+               existing_nullable=False)
@@ -0,0 +1,40 @@
+"""add report snapshots and item date indexes
+
+Revision ID: a9f1c3e5d702
+Revises: 7d3a9c5e1b28
+Create Date: 2026-10-19 19:41:52.208316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9f1c3e5d702'
+down_revision = '7d3a9c5e1b28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('report_snapshot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=10), nullable=False),
+    sa.Column('period_key', sa.String(length=10), nullable=False),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('period', 'period_key')
+    )
+    # Reports select purchases and sales by date range
+    with op.batch_alter_table('item', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_item_purchase_date'), ['purchase_date'], unique=False)
+        batch_op.create_index(batch_op.f('ix_item_selling_date'), ['selling_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('item', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_item_selling_date'))
+        batch_op.drop_index(batch_op.f('ix_item_purchase_date'))
+
+    op.drop_table('report_snapshot')
@@ -0,0 +1,108 @@
+"""add expense ledger
+
+Revision ID: b4e8d2f6a913
+Revises: a9f1c3e5d702
+Create Date: 2026-10-19 20:37:05.114862
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e8d2f6a913'
+down_revision = 'a9f1c3e5d702'
+branch_labels = None
+depends_on = None
+
+EXPENSE_COLUMNS = {
+    'transport': 'transport_cost',
+    'food': 'food_cost',
+    'fuel': 'fuel_cost',
+    'other': 'other_expenses',
+}
+
+item = sa.table(
+    'item',
+    sa.column('id', sa.Integer),
+    sa.column('selling_price', sa.Float),
+    sa.column('gross_profit', sa.Float),
+    sa.column('net_profit', sa.Float),
+    sa.column('selling_expenses', sa.Float),
+    *(sa.column(column, sa.Float) for column in EXPENSE_COLUMNS.values()),
+)
+
+
+def upgrade():
+    expense = op.create_table('expense',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('phase', sa.String(length=10), nullable=False),
+    sa.Column('category', sa.String(length=20), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['item_id'], ['item.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('item_id', 'phase', 'category')
+    )
+
+    # Unsold items hold their purchase expenses in the columns. Selling
+    # overwrote them with the sale expenses, so for sold items they become
+    # sale entries and the purchase expenses are whatever the stored net
+    # profit still accounts for, booked as 'other'.
+    conn = op.get_bind()
+    rows = []
+    for row in conn.execute(sa.select(item)).mappings().all():
+        amounts = {category: round(row[column] or 0, 2) for category, column in EXPENSE_COLUMNS.items()}
+        if row['selling_price'] is None:
+            rows.extend(
+                {'item_id': row['id'], 'phase': 'purchase', 'category': category, 'amount': amount}
+                for category, amount in amounts.items() if amount
+            )
+            continue
+
+        sale_total = round(sum(amounts.values()), 2)
+        purchase_total = 0
+        if row['gross_profit'] is not None and row['net_profit'] is not None:
+            purchase_total = round(row['gross_profit'] - row['net_profit'] - sale_total, 2)
+        if purchase_total < 0.005:
+            purchase_total = 0
+        rows.extend(
+            {'item_id': row['id'], 'phase': 'sale', 'category': category, 'amount': amount}
+            for category, amount in amounts.items() if amount
+        )
+        if purchase_total:
+            rows.append({'item_id': row['id'], 'phase': 'purchase', 'category': 'other', 'amount': purchase_total})
+        conn.execute(
+            item.update().where(item.c.id == row['id']).values(
+                selling_expenses=sale_total,
+                other_expenses=purchase_total,
+                **{column: 0 for category, column in EXPENSE_COLUMNS.items() if category != 'other'},
+            )
+        )
+
+    if rows:
+        op.bulk_insert(expense, rows)
+
+
+def downgrade():
+    # Sold items go back to holding their sale expenses in the columns
+    expense = sa.table(
+        'expense',
+        sa.column('item_id', sa.Integer),
+        sa.column('phase', sa.String),
+        sa.column('category', sa.String),
+        sa.column('amount', sa.Float),
+    )
+    conn = op.get_bind()
+    conn.execute(
+        item.update().where(item.c.selling_price.isnot(None)).values(
+            selling_expenses=0,
+            **{column: 0 for column in EXPENSE_COLUMNS.values()},
+        )
+    )
+    for item_id, category, amount in conn.execute(
+        sa.select(expense.c.item_id, expense.c.category, expense.c.amount).where(expense.c.phase == 'sale')
+    ).all():
+        conn.execute(item.update().where(item.c.id == item_id).values({EXPENSE_COLUMNS[category]: amount}))
+
+    op.drop_table('expense')
@@ -0,0 +1,121 @@
+"""add party directory
+
+Revision ID: c5b7e9a1f2d4
+Revises: 8a4e6f2c1d37
+Create Date: 2026-10-19 15:12:41.308114
+
+"""
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5b7e9a1f2d4'
+down_revision = '8a4e6f2c1d37'
+branch_labels = None
+depends_on = None
+
+item = sa.table(
+    'item',
+    sa.column('id', sa.Integer),
+    sa.column('purchase_date', sa.Date),
+    sa.column('selling_date', sa.Date),
+    sa.column('seller_name', sa.String),
+    sa.column('seller_nic', sa.String),
+    sa.column('seller_contact', sa.String),
+    sa.column('seller_location', sa.String),
+    sa.column('buyer_name', sa.String),
+    sa.column('buyer_nic', sa.String),
+    sa.column('buyer_contact', sa.String),
+    sa.column('buyer_location', sa.String),
+    sa.column('seller_id', sa.Integer),
+    sa.column('buyer_id', sa.Integer),
+)
+
+
+def normalize_nic(nic):
+    nic = ''.join((nic or '').split()).upper()
+    return nic or None
+
+
+def upgrade():
+    op.create_table('party',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nic', sa.String(length=20, collation='NOCASE'), nullable=False),
+    sa.Column('name', sa.String(length=100, collation='NOCASE'), nullable=False),
+    sa.Column('contact', sa.String(length=20), nullable=True),
+    sa.Column('location', sa.String(length=200), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('nic')
+    )
+    with op.batch_alter_table('party', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_party_contact'), ['contact'], unique=False)
+        batch_op.create_index(batch_op.f('ix_party_name'), ['name'], unique=False)
+
+    with op.batch_alter_table('item', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('seller_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('buyer_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_item_seller_id'), ['seller_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_item_buyer_id'), ['buyer_id'], unique=False)
+        batch_op.create_foreign_key('fk_item_seller_id_party', 'party', ['seller_id'], ['id'])
+        batch_op.create_foreign_key('fk_item_buyer_id_party', 'party', ['buyer_id'], ['id'])
+
+    # One party per NIC, with the details from its most recent purchase or sale
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(item)).fetchall()
+    latest = {}
+    links = []
+    for row in rows:
+        seller_nic = normalize_nic(row.seller_nic)
+        buyer_nic = normalize_nic(row.buyer_nic)
+        for nic, when, name, contact, location in (
+            (seller_nic, row.purchase_date, row.seller_name, row.seller_contact, row.seller_location),
+            (buyer_nic, row.selling_date, row.buyer_name, row.buyer_contact, row.buyer_location),
+        ):
+            key = (when or date.min, row.id)
+            if nic and name and (nic not in latest or key >= latest[nic][0]):
+                latest[nic] = (key, name, contact, location)
+        links.append((row.id, seller_nic, buyer_nic))
+
+    party = sa.table(
+        'party',
+        sa.column('id', sa.Integer),
+        sa.column('nic', sa.String),
+        sa.column('name', sa.String),
+        sa.column('contact', sa.String),
+        sa.column('location', sa.String),
+        sa.column('created_at', sa.DateTime),
+        sa.column('updated_at', sa.DateTime),
+    )
+    now = datetime.utcnow()
+    if latest:
+        conn.execute(party.insert(), [
+            {'nic': nic, 'name': name, 'contact': contact, 'location': location, 'created_at': now, 'updated_at': now}
+            for nic, (_, name, contact, location) in latest.items()
+        ])
+    party_ids = dict(conn.execute(sa.select(party.c.nic, party.c.id)).fetchall())
+
+    for item_id, seller_nic, buyer_nic in links:
+        conn.execute(item.update().where(item.c.id == item_id).values(
+            seller_id=party_ids.get(seller_nic), buyer_id=party_ids.get(buyer_nic)
+        ))
+
+
+def downgrade():
+    with op.batch_alter_table('item', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_item_buyer_id_party', type_='foreignkey')
+        batch_op.drop_constraint('fk_item_seller_id_party', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_item_buyer_id'))
+        batch_op.drop_index(batch_op.f('ix_item_seller_id'))
+        batch_op.drop_column('buyer_id')
+        batch_op.drop_column('seller_id')
+
+    with op.batch_alter_table('party', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_party_name'))
+        batch_op.drop_index(batch_op.f('ix_party_contact'))
+
+    op.drop_table('party')
@@ -0,0 +1,39 @@
+"""add device identifiers
+
+Revision ID: d6a2f8c4e317
+Revises: b4e8d2f6a913
+Create Date: 2026-10-19 21:52:40.683190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6a2f8c4e317'
+down_revision = 'b4e8d2f6a913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('item', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('imei', sa.String(length=15), nullable=True))
+        batch_op.add_column(sa.Column('serial_number', sa.String(length=100), nullable=True))
+        batch_op.create_index(batch_op.f('ix_item_imei'), ['imei'], unique=False)
+        batch_op.create_index(batch_op.f('ix_item_serial_number'), ['serial_number'], unique=False)
+        # A unit can be in stock only once; sold units may be bought back
+        batch_op.create_index('uq_item_imei_in_stock', ['imei'], unique=True,
+                              sqlite_where=sa.text('imei IS NOT NULL AND selling_price IS NULL'))
+        batch_op.create_index('uq_item_serial_number_in_stock', ['serial_number'], unique=True,
+                              sqlite_where=sa.text('serial_number IS NOT NULL AND selling_price IS NULL'))
+
+
+def downgrade():
+    with op.batch_alter_table('item', schema=None) as batch_op:
+        batch_op.drop_index('uq_item_serial_number_in_stock')
+        batch_op.drop_index('uq_item_imei_in_stock')
+        batch_op.drop_index(batch_op.f('ix_item_serial_number'))
+        batch_op.drop_index(batch_op.f('ix_item_imei'))
+        batch_op.drop_column('serial_number')
+        batch_op.drop_column('imei')
@@ -0,0 +1,68 @@
+"""add spec value counts
+
+Revision ID: e2d84b6c0a95
+Revises: c5b7e9a1f2d4
+Create Date: 2026-10-19 17:03:27.554019
+
+"""
+import json
+from collections import Counter
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2d84b6c0a95'
+down_revision = 'c5b7e9a1f2d4'
+branch_labels = None
+depends_on = None
+
+SPEC_FIELDS = (
+    'cpu', 'cpu_speed', 'ram_capacity', 'ram_type', 'ram_speed',
+    'storage_type', 'storage_size', 'gpu_type', 'gpu_memory',
+    'display_type', 'display_resolution', 'model', 'capacity'
+)
+
+item = sa.table(
+    'item',
+    sa.column('id', sa.Integer),
+    sa.column('specifications', sa.Text),
+)
+
+
+def upgrade():
+    spec_value = op.create_table('spec_value',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('field', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.String(length=200), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('field', 'value')
+    )
+
+    # Count the existing values as entered; `flask normalize-specs` merges
+    # near-duplicates separately
+    conn = op.get_bind()
+    counts = Counter()
+    for (specifications,) in conn.execute(sa.select(item.c.specifications)):
+        try:
+            specs = json.loads(specifications) if specifications else {}
+        except ValueError:
+            continue
+        if not isinstance(specs, dict):
+            continue
+        for field in SPEC_FIELDS:
+            value = ' '.join(str(specs.get(field) or '').split())
+            if value:
+                counts[(field, value)] += 1
+
+    if counts:
+        op.bulk_insert(spec_value, [
+            {'field': field, 'value': value, 'count': count}
+            for (field, value), count in counts.items()
+        ])
+
+
+def downgrade():
+    op.drop_table('spec_value')
@@ -0,0 +1,42 @@
+from sqlalchemy import and_
+
+# Upper bound for prefix ranges: sorts after any character a prefix can continue with
+PREFIX_RANGE_END = '\U0010ffff'
+
+AUTOCOMPLETE_FIELDS = ('name', 'nic', 'contact')
+DEFAULT_AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 25
+
+
+def normalize_nic(nic):
+    """Canonical form of a NIC number: no whitespace, upper case ('123 456 789v' -> '123456789V')."""
+    nic = ''.join((nic or '').split()).upper()
+    return nic or None
+
+
+def prefix_range(column, prefix):
+    """Match column values starting with prefix as an index range scan.
+
+    Unlike LIKE 'prefix%', a range comparison uses the column's index
+    whatever the LIKE settings, and honours its collation (NOCASE columns
+    match case-insensitively).
+    """
+    return and_(column >= prefix, column < prefix + PREFIX_RANGE_END)
+
+
+def autocomplete_ranges(model, query, fields=AUTOCOMPLETE_FIELDS):
+    """(column, prefix range) for each field to search.
+
+    Each range is meant to be queried on its own, ordered by its column,
+    so it reads just the first rows of that column's index. An OR of the
+    ranges would make SQLite collect and sort every match.
+    """
+    ranges = []
+    for field in fields:
+        if field not in AUTOCOMPLETE_FIELDS:
+            raise ValueError(f"Unknown autocomplete field: {field}")
+        value = normalize_nic(query) if field == 'nic' else query
+        if value:
+            column = getattr(model, field)
+            ranges.append((column, prefix_range(column, value)))
+    return ranges
@@ -0,0 +1,216 @@
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# The profile being collected for the request handled by this thread
+_local = threading.local()
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+# Since Python 3.12 cProfile uses sys.monitoring, which one profiler at a
+# time can use in the whole process (and which sees every thread's calls),
+# so only one request is traced with cProfile at a time
+_cprofile_lock = threading.Lock()
+
+
+def current_profile():
+    return getattr(_local, 'profile', None)
+
+
+class StackSampler(threading.Thread):
+    """Periodically sample the stack of one thread into folded stacks.
+
+    The output is one "frame;frame;frame count" line per distinct stack,
+    which flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def folded(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+
+class RequestProfile:
+    """Profiler trace, SQL statements and Drive calls for one request."""
+
+    def __init__(self, mode='cprofile'):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.mode = mode
+        self.events = []
+        self.profiler = None
+        self.sampler = None
+        self.started = None
+        self.duration = None
+
+    def start(self):
+        """Start tracing this thread.
+
+        A cProfile request falls back to stack sampling while another
+        request holds the profiler, or if it cannot be enabled.
+        """
+        self.started = time.perf_counter()
+        if self.mode == 'cprofile' and _cprofile_lock.acquire(blocking=False):
+            try:
+                self.profiler = cProfile.Profile()
+                self.profiler.enable()
+            except ValueError:
+                # Another profiling tool (e.g. a debugger) is active
+                self.profiler = None
+                _cprofile_lock.release()
+        if self.profiler is None:
+            self.mode = 'sample'
+            self.sampler = StackSampler(threading.get_ident())
+            self.sampler.start()
+        _local.profile = self
+
+    def stop(self):
+        if self.profiler is not None and self.duration is None:
+            self.profiler.disable()
+            _cprofile_lock.release()
+        if self.sampler is not None:
+            self.sampler.stop()
+        self.duration = time.perf_counter() - self.started
+        _local.profile = None
+
+    def add_event(self, kind, name, duration):
+        self.events.append({
+            'kind': kind,
+            'name': name,
+            'offset_ms': round((time.perf_counter() - self.started - duration) * 1000, 3),
+            'duration_ms': round(duration * 1000, 3),
+        })
+
+
+def traced(kind):
+    """Record calls to the decorated function in the current request profile."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = current_profile()
+            if profile is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.add_event(kind, func.__name__, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile() is not None:
+        conn.info.setdefault('profile_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile()
+    starts = conn.info.get('profile_query_start')
+    if profile is not None and starts:
+        profile.add_event('sql', statement, time.perf_counter() - starts.pop())
+
+
+class ProfileStore:
+    """Rotating directory of request profiles.
+
+    Each profile is saved as <name>.json (request metadata, SQL and Drive
+    events) plus <name>.prof (cProfile stats, for snakeviz or flameprof) or
+    <name>.folded (sampled stacks, for flamegraph.pl or speedscope).
+    Only the newest max_profiles are kept.
+    """
+
+    def __init__(self, directory, max_profiles=200):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def save(self, profile, method, path, status_code, username=None):
+        os.makedirs(self.directory, exist_ok=True)
+        now = datetime.utcnow()
+        name = f"{now.strftime('%Y%m%d-%H%M%S-%f')}-{int(profile.duration * 1000)}ms"
+
+        if profile.profiler is not None:
+            trace_file = name + '.prof'
+            profile.profiler.dump_stats(os.path.join(self.directory, trace_file))
+        else:
+            trace_file = name + '.folded'
+            with open(os.path.join(self.directory, trace_file), 'w') as f:
+                f.write(profile.sampler.folded())
+
+        meta = {
+            'name': name,
+            'timestamp': now.isoformat(),
+            'method': method,
+            'path': path,
+            'status': status_code,
+            'user': username,
+            'mode': profile.mode,
+            'duration_ms': round(profile.duration * 1000, 3),
+            'sql_count': sum(1 for e in profile.events if e['kind'] == 'sql'),
+            'sql_ms': round(sum(e['duration_ms'] for e in profile.events if e['kind'] == 'sql'), 3),
+            'drive_ms': round(sum(e['duration_ms'] for e in profile.events if e['kind'] == 'drive'), 3),
+            'trace_file': trace_file,
+            'events': profile.events,
+        }
+        with open(os.path.join(self.directory, name + '.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        self._rotate()
+        return name
+
+    def _rotate(self):
+        with self._lock:
+            names = sorted(f[:-5] for f in os.listdir(self.directory) if f.endswith('.json'))
+            for old in names[:max(0, len(names) - self.max_profiles)]:
+                for suffix in ('.json', '.prof', '.folded'):
+                    try:
+                        os.remove(os.path.join(self.directory, old + suffix))
+                    except FileNotFoundError:
+                        pass
+
+    def slowest(self, limit=50):
+        """Return metadata of the slowest stored profiles, slowest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.json'):
+                try:
+                    with open(os.path.join(self.directory, filename)) as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        profiles.sort(key=lambda p: p['duration_ms'], reverse=True)
+        return profiles[:limit]
@@ -0,0 +1,324 @@
+import csv
+import io
+from datetime import date
+
+from sqlalchemy import and_, func, or_, text
+
+from expense_utils import EXPENSE_CATEGORIES
+
+PERIODS = ('month', 'quarter')
+
+SUMMARY_COLUMNS = [
+    ('period', 'Period'),
+    ('purchased', 'Bought'),
+    ('purchase_cost', 'Purchase cost'),
+    ('transport', 'Transport'),
+    ('food', 'Food'),
+    ('fuel', 'Fuel'),
+    ('other', 'Other'),
+    ('expenses', 'Expenses'),
+    ('sold', 'Sold'),
+    ('revenue', 'Revenue'),
+    ('gross_profit', 'Gross profit'),
+    ('net_profit', 'Net profit'),
+    ('avg_days_in_stock', 'Avg days in stock'),
+]
+
+SELL_THROUGH_COLUMNS = [
+    ('period', 'Period'),
+    ('item_type', 'Type'),
+    ('opening', 'Opening stock'),
+    ('purchased', 'Bought'),
+    ('sold', 'Sold'),
+    ('sell_through', 'Sell-through %'),
+]
+
+
+def period_key(period, day):
+    """'2024-03' for a month, '2024-Q1' for a quarter."""
+    if period == 'quarter':
+        return f"{day.year}-Q{(day.month - 1) // 3 + 1}"
+    return f"{day.year}-{day.month:02d}"
+
+
+def from_period(column, period, day):
+    """SQL condition on a period_key column: the period of day or a later one."""
+    key = period_key(period, day)
+    # Keys of years with more digits are longer; keys of the same length sort as text
+    return or_(func.length(column) > len(key), and_(func.length(column) == len(key), column >= key))
+
+
+def period_ranges(period, year):
+    """[(key, first day, first day of the next period)] for the periods of a year."""
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    step = 3 if period == 'quarter' else 1
+    ranges = []
+    for month in range(1, 13, step):
+        start = date(year, month, 1)
+        end = date(year + (month + step > 12), (month + step - 1) % 12 + 1, 1)
+        ranges.append((period_key(period, start), start, end))
+    return ranges
+
+
+def _key_sql(column, period):
+    """SQL expression computing period_key() of a date column.
+
+    Dates are stored as ISO text, so slicing it is enough (and cheaper than strftime).
+    """
+    if period == 'quarter':
+        return f"substr({column}, 1, 4) || '-Q' || ((CAST(substr({column}, 6, 2) AS INTEGER) + 2) / 3)"
+    return f"substr({column}, 1, 7)"
+
+
+def _purchases_sql(period):
+    return f"""
+        SELECT {_key_sql('purchase_date', period)} AS period,
+               COUNT(*) AS purchased,
+               ROUND(TOTAL(item_price), 2) AS purchase_cost
+        FROM item
+        WHERE purchase_date >= :start AND purchase_date < :end
+        GROUP BY 1
+    """
+
+
+def _expenses_sql(period):
+    # Purchase expenses fall in the period the item was bought, sale
+    # expenses in the period it was sold
+    return f"""
+        SELECT period, category, ROUND(TOTAL(amount), 2) AS amount
+        FROM (
+            SELECT {_key_sql('item.purchase_date', period)} AS period, expense.category, expense.amount
+            FROM item JOIN expense ON expense.item_id = item.id AND expense.phase = 'purchase'
+            WHERE item.purchase_date >= :start AND item.purchase_date < :end
+            UNION ALL
+            SELECT {_key_sql('item.selling_date', period)}, expense.category, expense.amount
+            FROM item JOIN expense ON expense.item_id = item.id AND expense.phase = 'sale'
+            WHERE item.selling_date >= :start AND item.selling_date < :end
+        )
+        GROUP BY period, category
+    """
+
+
+def _sales_sql(period):
+    # Profits are derived from the ledger rather than read from the item
+    return f"""
+        SELECT {_key_sql('selling_date', period)} AS period,
+               COUNT(*) AS sold,
+               ROUND(TOTAL(selling_price), 2) AS revenue,
+               ROUND(TOTAL(selling_price - item_price), 2) AS gross_profit,
+               ROUND(TOTAL(selling_price - item_price) - TOTAL(
+                   (SELECT TOTAL(amount) FROM expense WHERE expense.item_id = item.id)
+               ), 2) AS net_profit,
+               AVG(julianday(selling_date) - julianday(purchase_date)) AS avg_days_in_stock
+        FROM item
+        WHERE selling_date >= :start AND selling_date < :end
+        GROUP BY 1
+    """
+
+
+def _sell_through_sql(period):
+    # Opening stock is what was in stock at the start of the range plus a
+    # running sum of the movements of the earlier periods in the range
+    return f"""
+        WITH stock AS (
+            SELECT item_type, COUNT(*) - COUNT(CASE WHEN selling_date < :start THEN 1 END) AS stock
+            FROM item
+            WHERE purchase_date < :start
+            GROUP BY item_type
+        ),
+        movements AS (
+            SELECT item_type, {_key_sql('purchase_date', period)} AS period, 1 AS purchased, 0 AS sold
+            FROM item WHERE purchase_date >= :start AND purchase_date < :end
+            UNION ALL
+            SELECT item_type, {_key_sql('selling_date', period)}, 0, 1
+            FROM item WHERE selling_date >= :start AND selling_date < :end
+        ),
+        per_period AS (
+            SELECT item_type, period, SUM(purchased) AS purchased, SUM(sold) AS sold
+            FROM movements
+            GROUP BY item_type, period
+        )
+        SELECT per_period.period, per_period.item_type,
+               COALESCE(stock.stock, 0) + COALESCE(SUM(purchased - sold) OVER (
+                   PARTITION BY per_period.item_type ORDER BY per_period.period
+                   ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+               ), 0) AS opening,
+               purchased, sold
+        FROM per_period
+        LEFT JOIN stock ON stock.item_type = per_period.item_type
+        ORDER BY per_period.period, per_period.item_type
+    """
+
+
+def sell_through(opening, purchased, sold):
+    """Share of the stock available in a period that was sold, in percent."""
+    available = opening + purchased
+    return round(100.0 * sold / available, 1) if available else None
+
+
+def empty_period(key):
+    row = {name: 0 for name, _ in SUMMARY_COLUMNS}
+    row.update(period=key, avg_days_in_stock=None, by_type=[])
+    return row
+
+
+def compute_periods(session, period, ranges):
+    """Compute the report rows of periods [(key, start, end)] in SQL.
+
+    The queries cover ranges[0] to ranges[-1]; results of periods in
+    between that are not in ranges are skipped.
+    """
+    start, end = ranges[0][1], ranges[-1][2]
+    params = {'start': start.isoformat(), 'end': end.isoformat()}
+    rows = {key: empty_period(key) for key, _, _ in ranges}
+
+    for result in session.execute(text(_purchases_sql(period)), params).mappings():
+        if result['period'] in rows:
+            rows[result['period']].update(result)
+    for result in session.execute(text(_expenses_sql(period)), params).mappings():
+        row = rows.get(result['period'])
+        if row is None:
+            continue
+        if result['category'] in EXPENSE_CATEGORIES:
+            row[result['category']] = result['amount']
+        row['expenses'] = round(row['expenses'] + result['amount'], 2)
+    for result in session.execute(text(_sales_sql(period)), params).mappings():
+        row = rows.get(result['period'])
+        if row is None:
+            continue
+        row.update(result)
+        if row['avg_days_in_stock'] is not None:
+            row['avg_days_in_stock'] = round(row['avg_days_in_stock'], 1)
+    for result in session.execute(text(_sell_through_sql(period)), params).mappings():
+        if result['period'] in rows:
+            entry = dict(result)
+            entry['sell_through'] = sell_through(entry['opening'], entry['purchased'], entry['sold'])
+            rows[result['period']]['by_type'].append(entry)
+    return rows
+
+
+def total_row(rows, label='Total'):
+    """Combine period rows into one row for the whole range."""
+    total = empty_period(label)
+    for row in rows:
+        for name, _ in SUMMARY_COLUMNS[1:]:
+            if name != 'avg_days_in_stock':
+                total[name] = round(total[name] + row[name], 2)
+    days = [(row['avg_days_in_stock'], row['sold']) for row in rows if row['avg_days_in_stock'] is not None]
+    if days:
+        total['avg_days_in_stock'] = round(sum(avg * sold for avg, sold in days) / sum(sold for _, sold in days), 1)
+
+    # Opening stock is the one at the start of the range
+    by_type = {}
+    for row in rows:
+        for entry in row['by_type']:
+            combined = by_type.setdefault(entry['item_type'], {
+                'period': label, 'item_type': entry['item_type'], 'opening': entry['opening'], 'purchased': 0, 'sold': 0
+            })
+            combined['purchased'] += entry['purchased']
+            combined['sold'] += entry['sold']
+    for entry in by_type.values():
+        entry['sell_through'] = sell_through(entry['opening'], entry['purchased'], entry['sold'])
+    total['by_type'] = sorted(by_type.values(), key=lambda entry: entry['item_type'])
+    return total
+
+
+def format_value(value):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
+
+
+def report_csv(rows, total):
+    """The report as CSV: the period summary, then sell-through by item type."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow([label for _, label in SUMMARY_COLUMNS])
+    for row in rows + [total]:
+        writer.writerow(['' if row[name] is None else row[name] for name, _ in SUMMARY_COLUMNS])
+    writer.writerow([])
+    writer.writerow([label for _, label in SELL_THROUGH_COLUMNS])
+    for row in rows + [total]:
+        for entry in row['by_type']:
+            writer.writerow(['' if entry[name] is None else entry[name] for name, _ in SELL_THROUGH_COLUMNS])
+    return output.getvalue()
+
+
+def text_table(columns, rows):
+    """Fixed-width text lines for a table of dicts."""
+    cells = [[label for _, label in columns]] + [[format_value(row[name]) for name, _ in columns] for row in rows]
+    widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+    lines = []
+    for n, line in enumerate(cells):
+        lines.append('  '.join(
+            cell.ljust(width) if i == 0 else cell.rjust(width)
+            for i, (cell, width) in enumerate(zip(line, widths))
+        ))
+        if n == 0:
+            lines.append('  '.join('-' * width for width in widths))
+    return lines
+
+
+def report_pdf(title, rows, total):
+    """The report as a PDF of monospaced text tables."""
+    lines = [title, '']
+    lines += text_table(SUMMARY_COLUMNS, rows + [total])
+    lines += ['', 'Sell-through by item type', '']
+    lines += text_table(SELL_THROUGH_COLUMNS, [entry for row in rows + [total] for entry in row['by_type']])
+    return text_pdf(lines)
+
+
+# A4 landscape, in points
+PDF_PAGE_WIDTH = 842
+PDF_PAGE_HEIGHT = 595
+PDF_MARGIN = 36
+PDF_FONT_SIZE = 7
+PDF_LEADING = 9
+
+
+def _pdf_escape(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)').encode('latin-1', 'replace')
+
+
+def text_pdf(lines):
+    """A minimal PDF showing lines of Courier text, paginated."""
+    per_page = (PDF_PAGE_HEIGHT - 2 * PDF_MARGIN) // PDF_LEADING
+    pages = [lines[i:i + per_page] for i in range(0, len(lines), per_page)] or [[]]
+
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and its content per page
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>',
+    ]
+    page_ids = []
+    for page in pages:
+        stream = b'BT /F1 %d Tf %d TL %d %d Td\n' % (
+            PDF_FONT_SIZE, PDF_LEADING, PDF_MARGIN, PDF_PAGE_HEIGHT - PDF_MARGIN
+        )
+        stream += b''.join(b'(' + _pdf_escape(line) + b') Tj T*\n' for line in page) + b'ET'
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        content_id = len(objects)
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>'
+            % (PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT, content_id)
+        )
+        page_ids.append(len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % page_id for page_id in page_ids), len(page_ids)
+    )
+
+    output = io.BytesIO()
+    output.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(output.tell())
+        output.write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+    xref = output.tell()
+    output.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    output.write(b''.join(b'%010d 00000 n \n' % offset for offset in offsets))
+    output.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return output.getvalue()
@@ -1,6 +1,6 @@
-from app import app, db
+from app import app, setup_database
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        setup_database()
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
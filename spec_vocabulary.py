@@ -0,0 +1,202 @@
+import heapq
+import json
+import re
+import threading
+import time
+from collections import Counter
+
+# Specification fields with a vocabulary; features and remarks are free-form
+SPEC_FIELDS = (
+    'cpu', 'cpu_speed', 'ram_capacity', 'ram_type', 'ram_speed',
+    'storage_type', 'storage_size', 'gpu_type', 'gpu_memory',
+    'display_type', 'display_resolution', 'model', 'capacity'
+)
+
+DEFAULT_COMPLETION_LIMIT = 10
+MAX_COMPLETION_LIMIT = 50
+
+# Trie depth; longer prefixes are checked against the values it finds
+TRIE_DEPTH = 24
+
+# Characters ignored when deciding whether two values are the same
+_KEY_IGNORED_RE = re.compile(r'[\s\-_/()]+')
+_WORD_START_RE = re.compile(r'(?:^|(?<=[\s\-_/(]))\S')
+
+
+def clean_spec_value(value):
+    """Trim a spec value and collapse runs of whitespace."""
+    return ' '.join(str(value).split()) if value is not None else ''
+
+
+def spec_key(value):
+    """Key under which near-duplicate values merge.
+
+    Case, whitespace and separators are ignored, so "Core i5-8250U",
+    "core i5 8250u" and "Core I5 - 8250U" share the key "corei58250u".
+    """
+    return _KEY_IGNORED_RE.sub('', clean_spec_value(value)).lower()
+
+
+def word_suffixes(value):
+    """Lower-cased value from each word start: "Core i5" -> "core i5", "i5"."""
+    value = value.lower()
+    return [value[match.start():] for match in _WORD_START_RE.finditer(value)]
+
+
+def spec_values(specs):
+    """Yield (field, value) for the vocabulary fields of a specs dict or JSON string."""
+    if isinstance(specs, str):
+        try:
+            specs = json.loads(specs) if specs else {}
+        except ValueError:
+            return
+    if not isinstance(specs, dict):
+        return
+    for field in SPEC_FIELDS:
+        value = clean_spec_value(specs.get(field))
+        if value and spec_key(value):
+            yield field, value
+
+
+def spec_value_changes(old_specs, new_specs):
+    """Count changes per (field, value) between two versions of an item's specs."""
+    changes = Counter(spec_values(new_specs))
+    changes.subtract(Counter(spec_values(old_specs)))
+    return {pair: delta for pair, delta in changes.items() if delta}
+
+
+class PrefixTrie:
+    """Character trie mapping prefixes to the keys of the values they start.
+
+    Only the first depth characters of each text are stored.
+    """
+
+    def __init__(self, depth=TRIE_DEPTH):
+        self.depth = depth
+        self._root = {}
+
+    def insert(self, text, key):
+        node = self._root
+        for char in text[:self.depth]:
+            node = node.setdefault(char, {})
+        node.setdefault(None, set()).add(key)
+
+    def keys_with_prefix(self, prefix):
+        node = self._root
+        for char in prefix[:self.depth]:
+            node = node.get(char)
+            if node is None:
+                return set()
+        keys = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for char, child in node.items():
+                if char is None:
+                    keys.update(child)
+                else:
+                    stack.append(child)
+        return keys
+
+
+class SpecVocabulary:
+    """In-memory vocabulary of spec values per field, with usage counts.
+
+    Values are grouped by spec_key(); each group is shown as its most used
+    spelling. Completion matches a prefix of any word of the value
+    ("i5" finds "Intel Core i5-8250U") through a trie per field.
+
+    Changes made in this process apply immediately. Every ttl seconds the
+    signature of the persisted counts is checked and, if another worker
+    changed them, the vocabulary is reloaded.
+    """
+
+    def __init__(self, loader, signature=None, ttl=60):
+        self.loader = loader
+        self.signature = signature
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._signature = None
+        self._variants = {}
+        self._totals = {}
+        self._tries = {}
+
+    def _reset(self):
+        # field -> key -> Counter of spellings, and their summed count
+        self._variants = {field: {} for field in SPEC_FIELDS}
+        self._totals = {field: Counter() for field in SPEC_FIELDS}
+        self._tries = {field: PrefixTrie() for field in SPEC_FIELDS}
+
+    def _add(self, field, value, count):
+        key = spec_key(value)
+        variants = self._variants[field].setdefault(key, Counter())
+        if value not in variants:
+            for suffix in word_suffixes(value):
+                self._tries[field].insert(suffix, key)
+        variants[value] += count
+        self._totals[field][key] += count
+
+    def load(self):
+        """Rebuild from the loader's (field, value, count) rows."""
+        signature = self.signature() if self.signature else None
+        rows = self.loader()
+        with self._lock:
+            self._reset()
+            for field, value, count in rows:
+                if field in self._variants and count > 0:
+                    self._add(field, value, count)
+            self._signature = signature
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None:
+            self.load()
+        elif time.monotonic() - self._loaded_at > self.ttl:
+            if self.signature and self.signature() == self._signature:
+                self._loaded_at = time.monotonic()
+            else:
+                self.load()
+
+    def apply(self, changes):
+        """Apply {(field, value): delta} from a write made in this process."""
+        if self._loaded_at is None:
+            return
+        with self._lock:
+            for (field, value), delta in changes.items():
+                if field in self._variants:
+                    self._add(field, value, delta)
+            # The persisted signature changes with this write; reload at the
+            # next check rather than miss another worker's changes
+            self._signature = None
+
+    def canonical(self, field, value):
+        """The most used spelling of value's group, or value if it is new."""
+        self._ensure_fresh()
+        with self._lock:
+            variants = self._variants.get(field, {}).get(spec_key(value))
+            if variants:
+                spelling, count = variants.most_common(1)[0]
+                if count > 0:
+                    return spelling
+        return value
+
+    def complete(self, field, prefix='', limit=DEFAULT_COMPLETION_LIMIT):
+        """Most used values of field with a word starting with prefix."""
+        if field not in SPEC_FIELDS:
+            raise ValueError(f"Unknown spec field: {field}")
+        self._ensure_fresh()
+        prefix = clean_spec_value(prefix).lower()
+        with self._lock:
+            groups = self._variants[field]
+            totals = self._totals[field]
+            keys = self._tries[field].keys_with_prefix(prefix) if prefix else totals.keys()
+            if len(prefix) > TRIE_DEPTH:
+                keys = [key for key in keys if any(
+                    suffix.startswith(prefix) for value in groups[key] for suffix in word_suffixes(value)
+                )]
+            top = heapq.nsmallest(
+                limit, (key for key in keys if totals[key] > 0),
+                key=lambda key: (-totals[key], key)
+            )
+            return [{'value': groups[key].most_common(1)[0][0], 'count': totals[key]} for key in top]
@@ -0,0 +1,113 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Show/hide specifications based on item type
+    const itemTypeSelect = document.getElementById('item_type');
+    const laptopSpecs = document.getElementById('laptop_specs');
+    const smartphoneSpecs = document.getElementById('smartphone_specs');
+
+    function updateRequiredFields() {
+        const isLaptop = itemTypeSelect.value === 'laptop';
+        const isSmartphone = itemTypeSelect.value === 'smartphone';
+
+        // Laptop fields
+        const laptopFields = [
+            'cpu', 'cpu_speed', 'ram_capacity', 'ram_type', 'ram_speed',
+            'storage_type', 'storage_size', 'gpu_type', 'gpu_memory',
+            'display_type', 'display_resolution'
+        ];
+
+        // Smartphone fields
+        const smartphoneFields = ['model', 'capacity'];
+
+        // Update laptop fields
+        laptopFields.forEach(field => {
+            const input = document.querySelector(`[name="specs[${field}]"]`);
+            if (input) {
+                input.required = isLaptop;
+                if (!isLaptop) input.value = '';
+            }
+        });
+
+        // Update smartphone fields
+        smartphoneFields.forEach(field => {
+            const input = document.querySelector(`[name="specs[${field}]"]`);
+            if (input) {
+                input.required = isSmartphone;
+                if (!isSmartphone) input.value = '';
+            }
+        });
+
+        // Show/hide appropriate specs section
+        laptopSpecs.style.display = isLaptop ? 'block' : 'none';
+        smartphoneSpecs.style.display = isSmartphone ? 'block' : 'none';
+    }
+
+    itemTypeSelect.addEventListener('change', updateRequiredFields);
+
+    // Calculate total expenses and purchase amount
+    const expenseInputs = document.querySelectorAll('.expense-input');
+    const itemPriceInput = document.getElementById('item_price');
+    const displayItemPrice = document.getElementById('display_item_price');
+    const totalExpenses = document.getElementById('total_expenses');
+    const totalPurchase = document.getElementById('total_purchase');
+
+    function updateTotals() {
+        let expenses = 0;
+        expenseInputs.forEach(input => {
+            expenses += parseFloat(input.value) || 0;
+        });
+        const itemPrice = parseFloat(itemPriceInput.value) || 0;
+
+        displayItemPrice.textContent = itemPrice.toFixed(2);
+        totalExpenses.textContent = expenses.toFixed(2);
+        totalPurchase.textContent = (itemPrice + expenses).toFixed(2);
+    }
+
+    expenseInputs.forEach(input => {
+        input.addEventListener('input', updateTotals);
+    });
+    itemPriceInput.addEventListener('input', updateTotals);
+
+    // Form submission handling
+    const form = document.querySelector('form');
+    form.addEventListener('submit', function(event) {
+        console.log('Form submission started');
+
+        // Update required fields before validation
+        updateRequiredFields();
+
+        // Log form data
+        const formData = new FormData(form);
+        console.log('Form data:');
+        for (let [key, value] of formData.entries()) {
+            console.log(`${key}: ${value}`);
+        }
+
+        // Log files
+        const itemImages = document.getElementById('item_images').files;
+        const agreementImage = document.getElementById('agreement_image').files[0];
+        console.log('Item images:', itemImages.length);
+        console.log('Agreement image:', agreementImage ? agreementImage.name : 'none');
+
+        // Validate form
+        if (!form.checkValidity()) {
+            event.preventDefault();
+            event.stopPropagation();
+            console.log('Form validation failed');
+        } else {
+            console.log('Form validation passed');
+        }
+
+        form.classList.add('was-validated');
+    });
+
+    // Handle custom resolution input
+    const displayResolution = document.getElementById('display_resolution');
+    const customResolution = document.getElementById('custom_resolution');
+
+    if (displayResolution && customResolution) {
+        displayResolution.addEventListener('change', function() {
+            customResolution.style.display = this.value === 'custom' ? 'block' : 'none';
+            customResolution.required = this.value === 'custom';
+        });
+    }
+});
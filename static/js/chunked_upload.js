@@ -0,0 +1,186 @@
+// Chunked, resumable uploads for the item forms.
+//
+// Each file picked in an input with data-upload-token-field is sent to
+// /api/v1/uploads in fixed-size chunks. When a chunk fails (e.g. the phone
+// drops off mobile data) the upload asks the server how much arrived and
+// continues from there. Finished uploads add a hidden input holding the
+// upload token, which is what the form submits instead of the file.
+(function() {
+    const UPLOADS_URL = '/api/v1/uploads';
+    const MAX_RETRIES = 8;
+    const STORAGE_PREFIX = 'chunked-upload:';
+
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    function encodeMetadata(file) {
+        const encode = value => btoa(unescape(encodeURIComponent(value)));
+        return `filename ${encode(file.name)},filetype ${encode(file.type || 'application/octet-stream')}`;
+    }
+
+    // Uploads started on an earlier page load are resumed instead of restarted
+    function storageKey(file) {
+        return `${STORAGE_PREFIX}${file.name}:${file.size}:${file.lastModified}`;
+    }
+
+    async function request(method, url, headers, body) {
+        const response = await fetch(url, {method, headers, body, credentials: 'same-origin'});
+        if (!response.ok && response.status !== 409) {
+            let message = `Upload failed (${response.status})`;
+            try {
+                message = (await response.json()).error || message;
+            } catch (e) {}
+            const error = new Error(message);
+            // Client errors won't succeed on retry; server and network errors may
+            error.retriable = response.status >= 500 || response.status === 423;
+            throw error;
+        }
+        return response;
+    }
+
+    async function createUpload(file) {
+        const response = await request('POST', UPLOADS_URL, {
+            'Upload-Length': String(file.size),
+            'Upload-Metadata': encodeMetadata(file)
+        });
+        return response.json();
+    }
+
+    async function getOffset(token) {
+        const response = await request('HEAD', `${UPLOADS_URL}/${token}`);
+        return {
+            offset: parseInt(response.headers.get('Upload-Offset'), 10),
+            length: parseInt(response.headers.get('Upload-Length'), 10)
+        };
+    }
+
+    async function resumeOrCreate(file) {
+        const token = localStorage.getItem(storageKey(file));
+        if (token) {
+            try {
+                const status = await getOffset(token);
+                if (status.length === file.size) {
+                    return {token, offset: status.offset};
+                }
+            } catch (e) {
+                // Expired or discarded; start over
+            }
+        }
+        const upload = await createUpload(file);
+        localStorage.setItem(storageKey(file), upload.token);
+        return {token: upload.token, offset: 0};
+    }
+
+    async function uploadFile(file, chunkSize, onProgress) {
+        let {token, offset} = await resumeOrCreate(file);
+        let retries = 0;
+        onProgress(offset / file.size);
+
+        while (offset < file.size) {
+            const chunk = file.slice(offset, offset + chunkSize);
+            try {
+                const response = await request('PATCH', `${UPLOADS_URL}/${token}`, {
+                    'Content-Type': 'application/offset+octet-stream',
+                    'Upload-Offset': String(offset)
+                }, chunk);
+                // 409 means the server has a different offset; ask for it
+                offset = response.status === 409
+                    ? (await getOffset(token)).offset
+                    : parseInt(response.headers.get('Upload-Offset'), 10);
+                retries = 0;
+                onProgress(offset / file.size);
+            } catch (error) {
+                if (error.retriable === false || ++retries > MAX_RETRIES) {
+                    throw error;
+                }
+                await sleep(Math.min(1000 * 2 ** (retries - 1), 30000));
+                try {
+                    offset = (await getOffset(token)).offset;
+                } catch (e) {
+                    // Still offline; retry the same chunk after the next wait
+                }
+            }
+        }
+
+        localStorage.removeItem(storageKey(file));
+        return token;
+    }
+
+    function attach(form, input) {
+        const tokenField = input.dataset.uploadTokenField;
+        const chunkSize = parseInt(input.dataset.uploadChunkSize, 10) || 1024 * 1024;
+        const status = document.createElement('div');
+        status.className = 'upload-status form-text';
+        input.insertAdjacentElement('afterend', status);
+        let pending = Promise.resolve();
+
+        input.addEventListener('change', function() {
+            form.querySelectorAll(`input[type="hidden"][name="${tokenField}"]`).forEach(el => el.remove());
+            status.innerHTML = '';
+            const files = Array.from(input.files);
+
+            pending = Promise.all(files.map(file => {
+                const row = document.createElement('div');
+                row.className = 'upload-progress';
+                row.innerHTML = '<span class="upload-name"></span> <progress max="1" value="0"></progress> <span class="upload-state"></span>';
+                row.querySelector('.upload-name').textContent = file.name;
+                status.appendChild(row);
+                const progress = row.querySelector('progress');
+                const state = row.querySelector('.upload-state');
+
+                return uploadFile(file, chunkSize, fraction => {
+                    progress.value = fraction;
+                    state.textContent = `${Math.round(fraction * 100)}%`;
+                }).then(token => {
+                    const hidden = document.createElement('input');
+                    hidden.type = 'hidden';
+                    hidden.name = tokenField;
+                    hidden.value = token;
+                    form.appendChild(hidden);
+                    state.textContent = 'Uploaded';
+                }, error => {
+                    state.textContent = error.message;
+                    row.classList.add('text-danger');
+                    throw error;
+                });
+            }));
+            // Keep the rejection for submit; don't report it as unhandled here
+            pending.catch(() => {});
+        });
+
+        return () => pending;
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('form').forEach(form => {
+            const inputs = form.querySelectorAll('input[type="file"][data-upload-token-field]');
+            if (!inputs.length) {
+                return;
+            }
+            const waits = Array.from(inputs).map(input => attach(form, input));
+            let uploadsDone = false;
+
+            // Submit only once every picked file has finished uploading
+            form.addEventListener('submit', function(event) {
+                if (uploadsDone || event.defaultPrevented) {
+                    return;
+                }
+                event.preventDefault();
+                const button = form.querySelector('[type="submit"]');
+                if (button) {
+                    button.disabled = true;
+                }
+                Promise.all(waits.map(wait => wait())).then(() => {
+                    uploadsDone = true;
+                    form.submit();
+                }, () => {
+                    if (button) {
+                        button.disabled = false;
+                    }
+                    alert('Some files failed to upload. Pick them again to retry.');
+                });
+            });
+        });
+    });
+})();
@@ -0,0 +1,71 @@
+// Intake check backed by /api/v1/devices/check.
+//
+// When an input with data-device-identifier (IMEI or serial number)
+// changes, the device is looked up among earlier purchases and on the
+// blocklist, and any match is shown in #device_check before the form is
+// submitted.
+(function() {
+    const CHECK_URL = '/api/v1/devices/check';
+
+    document.addEventListener('DOMContentLoaded', function() {
+        const inputs = document.querySelectorAll('input[data-device-identifier]');
+        const box = document.getElementById('device_check');
+        if (!inputs.length || !box) {
+            return;
+        }
+        let controller = null;
+
+        function show(messages, danger) {
+            box.innerHTML = '';
+            messages.forEach(message => {
+                const line = document.createElement('div');
+                line.textContent = message;
+                box.appendChild(line);
+            });
+            box.classList.toggle('alert-danger', danger);
+            box.classList.toggle('alert-warning', !danger);
+            box.classList.toggle('d-none', messages.length === 0);
+        }
+
+        async function check() {
+            const params = new URLSearchParams();
+            inputs.forEach(input => {
+                if (input.value.trim()) {
+                    params.set(input.name, input.value.trim());
+                }
+            });
+            if (!params.toString()) {
+                show([], false);
+                return;
+            }
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            try {
+                const response = await fetch(`${CHECK_URL}?${params}`, {
+                    credentials: 'same-origin',
+                    signal: controller.signal
+                });
+                const data = await response.json();
+                if (!response.ok) {
+                    show([data.error], true);
+                    return;
+                }
+                const messages = data.blocked.map(value => `${value} is on the blocklist of stolen or blocked devices.`);
+                let danger = data.blocked.length > 0;
+                data.items.forEach(item => {
+                    danger = danger || !item.sold;
+                    messages.push(item.sold
+                        ? `Bought before as item #${item.id} (${item.name}) from ${item.seller_name} on ${item.purchase_date}, sold on ${item.selling_date}.`
+                        : `Already in stock as item #${item.id} (${item.name}), bought from ${item.seller_name} on ${item.purchase_date}.`);
+                });
+                show(messages, danger);
+            } catch (e) {
+                // Aborted by a newer change, or offline; the server checks again on submit
+            }
+        }
+
+        inputs.forEach(input => input.addEventListener('change', check));
+    });
+})();
@@ -0,0 +1,16 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Initialize tooltips
+    var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'))
+    var tooltipList = tooltipTriggerList.map(function (tooltipTriggerEl) {
+        return new bootstrap.Tooltip(tooltipTriggerEl)
+    });
+
+    // Handle item type change
+    const itemTypeSelect = document.querySelector('select[name="item_type"]');
+    const specsTab = document.querySelector('#specs');
+
+    itemTypeSelect.addEventListener('change', function() {
+        // Reload the page to show correct specs form
+        window.location.reload();
+    });
+});
@@ -0,0 +1,68 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Calculate total expenses in mark as sold modal
+    const expenseInputs = document.querySelectorAll('.expense-input');
+    expenseInputs.forEach(input => {
+        input.addEventListener('input', function() {
+            let total = 0;
+            expenseInputs.forEach(expense => {
+                total += parseFloat(expense.value) || 0;
+            });
+        });
+    });
+
+    // Multi-select for bulk actions
+    const selectAll = document.getElementById('selectAllItems');
+    const itemChecks = document.querySelectorAll('.item-select');
+    const bulkActions = document.getElementById('bulkActions');
+
+    function selectedItems() {
+        return Array.from(itemChecks).filter(check => check.checked);
+    }
+
+    function updateBulkActions() {
+        const selected = selectedItems();
+        bulkActions.classList.toggle('d-none', selected.length === 0);
+        document.querySelectorAll('.bulk-count').forEach(el => el.textContent = selected.length);
+    }
+
+    itemChecks.forEach(check => check.addEventListener('change', updateBulkActions));
+    selectAll.addEventListener('change', function() {
+        itemChecks.forEach(check => check.checked = selectAll.checked);
+        updateBulkActions();
+    });
+
+    // One selling price input per selected unsold item
+    document.getElementById('bulkSoldModal').addEventListener('show.bs.modal', function() {
+        const container = document.getElementById('bulkSellingPrices');
+        container.innerHTML = '';
+        selectedItems().filter(check => check.dataset.sold === 'false').forEach(check => {
+            const col = document.createElement('div');
+            col.className = 'col-md-6';
+            col.innerHTML = `<label class="form-label small text-muted"></label>
+                <div class="input-group input-group-sm">
+                    <span class="input-group-text">Rs.</span>
+                    <input type="number" class="form-control" name="selling_price[${check.value}]" step="0.01" required>
+                </div>`;
+            col.querySelector('label').textContent = check.dataset.name;
+            container.appendChild(col);
+        });
+    });
+
+    // Copy the selection into each bulk form on submit
+    document.querySelectorAll('.bulk-form').forEach(form => {
+        form.addEventListener('submit', function() {
+            form.querySelectorAll('input[name="item_ids"]').forEach(input => input.remove());
+            let selected = selectedItems();
+            if (form.action.endsWith('/bulk/mark_as_sold')) {
+                selected = selected.filter(check => check.dataset.sold === 'false');
+            }
+            selected.forEach(check => {
+                const input = document.createElement('input');
+                input.type = 'hidden';
+                input.name = 'item_ids';
+                input.value = check.value;
+                form.appendChild(input);
+            });
+        });
+    });
+});
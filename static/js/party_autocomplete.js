@@ -0,0 +1,98 @@
+// Seller/buyer autocomplete backed by /api/v1/parties.
+//
+// Inputs share a data-party-group; typing in a name, NIC or contact input
+// of the group lists matching parties, and picking one fills every input
+// of the group (data-party-field = name, nic, contact or location).
+(function() {
+    const PARTIES_URL = '/api/v1/parties';
+    const SEARCH_FIELDS = ['name', 'nic', 'contact'];
+    const DEBOUNCE_MS = 150;
+
+    function attach(input, groupInputs) {
+        const menu = document.createElement('div');
+        menu.className = 'dropdown-menu party-suggestions';
+        input.parentElement.classList.add('position-relative');
+        input.insertAdjacentElement('afterend', menu);
+
+        let timer = null;
+        let controller = null;
+
+        function hide() {
+            menu.classList.remove('show');
+        }
+
+        function fill(party) {
+            groupInputs.forEach(el => {
+                const value = party[el.dataset.partyField];
+                if (value) {
+                    el.value = value;
+                }
+            });
+            hide();
+        }
+
+        function show(parties) {
+            menu.innerHTML = '';
+            parties.forEach(party => {
+                const option = document.createElement('button');
+                option.type = 'button';
+                option.className = 'dropdown-item';
+                option.textContent = `${party.name} · ${party.nic}${party.contact ? ' · ' + party.contact : ''}`;
+                // mousedown fires before the input's blur hides the menu
+                option.addEventListener('mousedown', event => {
+                    event.preventDefault();
+                    fill(party);
+                });
+                menu.appendChild(option);
+            });
+            menu.classList.toggle('show', parties.length > 0);
+        }
+
+        async function search(q) {
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            const params = new URLSearchParams({q, fields: input.dataset.partyField});
+            try {
+                const response = await fetch(`${PARTIES_URL}?${params}`, {
+                    credentials: 'same-origin',
+                    signal: controller.signal
+                });
+                if (response.ok) {
+                    show((await response.json()).parties);
+                }
+            } catch (e) {
+                // Aborted by a newer keystroke, or offline; keep typing by hand
+            }
+        }
+
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            const q = input.value.trim();
+            if (!q) {
+                hide();
+                return;
+            }
+            timer = setTimeout(() => search(q), DEBOUNCE_MS);
+        });
+        input.addEventListener('blur', hide);
+        input.addEventListener('keydown', event => {
+            if (event.key === 'Escape') {
+                hide();
+            }
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        const groups = {};
+        document.querySelectorAll('[data-party-group]').forEach(input => {
+            (groups[input.dataset.partyGroup] = groups[input.dataset.partyGroup] || []).push(input);
+        });
+        Object.values(groups).forEach(groupInputs => {
+            groupInputs
+                .filter(input => SEARCH_FIELDS.includes(input.dataset.partyField))
+                .forEach(input => attach(input, groupInputs));
+        });
+    });
+})();
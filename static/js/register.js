@@ -0,0 +1,66 @@
+function togglePassword() {
+    const passwordInput = document.getElementById('password');
+    const toggleIcon = document.getElementById('toggleIcon');
+
+    if (passwordInput.type === 'password') {
+        passwordInput.type = 'text';
+        toggleIcon.classList.remove('fa-eye');
+        toggleIcon.classList.add('fa-eye-slash');
+    } else {
+        passwordInput.type = 'password';
+        toggleIcon.classList.remove('fa-eye-slash');
+        toggleIcon.classList.add('fa-eye');
+    }
+}
+
+function toggleConfirmPassword() {
+    const passwordInput = document.getElementById('confirm_password');
+    const toggleIcon = document.getElementById('toggleConfirmIcon');
+
+    if (passwordInput.type === 'password') {
+        passwordInput.type = 'text';
+        toggleIcon.classList.remove('fa-eye');
+        toggleIcon.classList.add('fa-eye-slash');
+    } else {
+        passwordInput.type = 'password';
+        toggleIcon.classList.remove('fa-eye-slash');
+        toggleIcon.classList.add('fa-eye');
+    }
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const password = document.getElementById('password');
+    const confirmPassword = document.getElementById('confirm_password');
+    const submitBtn = document.getElementById('submitBtn');
+
+    const requirements = {
+        length: { regex: /.{8,}/, element: document.getElementById('length') },
+        uppercase: { regex: /[A-Z]/, element: document.getElementById('uppercase') },
+        lowercase: { regex: /[a-z]/, element: document.getElementById('lowercase') },
+        number: { regex: /[0-9]/, element: document.getElementById('number') },
+        special: { regex: /[!@#$%^&*(),.?":{}|<>]/, element: document.getElementById('special') }
+    };
+
+    function checkPassword() {
+        let allMet = true;
+
+        for (const [key, req] of Object.entries(requirements)) {
+            if (req.regex.test(password.value)) {
+                req.element.classList.add('requirement-met');
+                req.element.classList.remove('requirement-unmet');
+                req.element.querySelector('i').className = 'fas fa-check';
+            } else {
+                req.element.classList.add('requirement-unmet');
+                req.element.classList.remove('requirement-met');
+                req.element.querySelector('i').className = 'fas fa-times';
+                allMet = false;
+            }
+        }
+
+        const passwordsMatch = password.value === confirmPassword.value && password.value !== '';
+        submitBtn.disabled = !(allMet && passwordsMatch);
+    }
+
+    password.addEventListener('input', checkPassword);
+    confirmPassword.addEventListener('input', checkPassword);
+});
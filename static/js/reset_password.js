@@ -0,0 +1,59 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const password = document.getElementById('password');
+    const confirmPassword = document.getElementById('confirmPassword');
+    const togglePassword = document.getElementById('togglePassword');
+    const toggleConfirmPassword = document.getElementById('toggleConfirmPassword');
+    const form = document.getElementById('resetForm');
+
+    // Toggle password visibility
+    function togglePasswordVisibility(input, button) {
+        const type = input.getAttribute('type') === 'password' ? 'text' : 'password';
+        input.setAttribute('type', type);
+        button.querySelector('i').classList.toggle('fa-eye');
+        button.querySelector('i').classList.toggle('fa-eye-slash');
+    }
+
+    togglePassword.addEventListener('click', () => togglePasswordVisibility(password, togglePassword));
+    toggleConfirmPassword.addEventListener('click', () => togglePasswordVisibility(confirmPassword, toggleConfirmPassword));
+
+    // Password validation
+    const requirements = {
+        length: { regex: /.{8,}/, element: document.getElementById('length') },
+        uppercase: { regex: /[A-Z]/, element: document.getElementById('uppercase') },
+        lowercase: { regex: /[a-z]/, element: document.getElementById('lowercase') },
+        number: { regex: /[0-9]/, element: document.getElementById('number') },
+        special: { regex: /[!@#$%^&*(),.?":{}|<>]/, element: document.getElementById('special') }
+    };
+
+    function validatePassword() {
+        const value = password.value;
+        let isValid = true;
+
+        for (const [key, requirement] of Object.entries(requirements)) {
+            const isMet = requirement.regex.test(value);
+            requirement.element.classList.toggle('requirement-met', isMet);
+            requirement.element.classList.toggle('requirement-unmet', !isMet);
+            requirement.element.querySelector('i').className = isMet ? 'fas fa-check' : 'fas fa-times';
+            if (!isMet) isValid = false;
+        }
+
+        return isValid;
+    }
+
+    password.addEventListener('input', validatePassword);
+
+    // Form submission
+    form.addEventListener('submit', function(e) {
+        if (!validatePassword()) {
+            e.preventDefault();
+            alert('Please meet all password requirements');
+            return;
+        }
+
+        if (password.value !== confirmPassword.value) {
+            e.preventDefault();
+            alert('Passwords do not match');
+            return;
+        }
+    });
+});
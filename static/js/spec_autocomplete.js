@@ -0,0 +1,55 @@
+// Spec value suggestions backed by /api/v1/specs/<field>.
+//
+// Inputs with data-spec-field get a datalist of the most used values of
+// that field that have a word starting with what has been typed, so staff
+// pick the existing spelling instead of typing a near-duplicate.
+(function() {
+    const SPECS_URL = '/api/v1/specs';
+    const DEBOUNCE_MS = 120;
+
+    function attach(input, index) {
+        const list = document.createElement('datalist');
+        list.id = `spec-values-${index}`;
+        input.setAttribute('list', list.id);
+        input.setAttribute('autocomplete', 'off');
+        input.insertAdjacentElement('afterend', list);
+
+        let timer = null;
+        let controller = null;
+
+        async function suggest() {
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            const params = new URLSearchParams({q: input.value.trim()});
+            try {
+                const response = await fetch(`${SPECS_URL}/${input.dataset.specField}?${params}`, {
+                    credentials: 'same-origin',
+                    signal: controller.signal
+                });
+                if (!response.ok) {
+                    return;
+                }
+                list.innerHTML = '';
+                (await response.json()).values.forEach(entry => {
+                    const option = document.createElement('option');
+                    option.value = entry.value;
+                    list.appendChild(option);
+                });
+            } catch (e) {
+                // Aborted by a newer keystroke, or offline
+            }
+        }
+
+        input.addEventListener('focus', suggest);
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(suggest, DEBOUNCE_MS);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('input[data-spec-field]').forEach(attach);
+    });
+})();
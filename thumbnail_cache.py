@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+
+
+def sniff_image_type(data):
+    """Return the MIME type of thumbnail bytes from their magic number."""
+    if data.startswith(b'\x89PNG'):
+        return 'image/png'
+    if data.startswith(b'GIF8'):
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/jpeg'
+
+
+class ThumbnailCache:
+    """On-disk cache of Drive thumbnails with TTL and a total size bound.
+
+    Entries expire ttl seconds after they were fetched. A hit touches the
+    file's access time, and when the cache grows past max_bytes the least
+    recently used files are removed first.
+    """
+
+    def __init__(self, directory, ttl=7 * 24 * 60 * 60, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if time.time() - stat.st_mtime > self.ttl:
+            self._remove(path)
+            return None
+        with open(path, 'rb') as f:
+            data = f.read()
+        # Record the access for LRU eviction without changing the fetch time
+        os.utime(path, (time.time(), stat.st_mtime))
+        return data
+
+    def set(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    entries.append((stat.st_atime, stat.st_size, entry.path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                self._remove(path)
+                total -= size
+                if total <= self.max_bytes:
+                    break
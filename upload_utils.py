@@ -0,0 +1,154 @@
+import base64
+import json
+import os
+import re
+import secrets
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends to one upload are not locked across processes
+    fcntl = None
+
+UPLOAD_TOKEN_RE = re.compile(r'[A-Za-z0-9_-]{16,64}')
+
+# Request bodies are copied to the spool file in blocks of this size
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A chunked upload request that can't be accepted, with its HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_upload_metadata(header):
+    """Parse a tus Upload-Metadata header: "key base64value,key base64value"."""
+    metadata = {}
+    for pair in (header or '').split(','):
+        parts = pair.strip().split(' ', 1)
+        if not parts[0]:
+            continue
+        try:
+            metadata[parts[0]] = base64.b64decode(parts[1]).decode('utf-8') if len(parts) > 1 else ''
+        except (ValueError, UnicodeDecodeError):
+            raise UploadError(f"Invalid Upload-Metadata value for {parts[0]}")
+    return metadata
+
+
+class UploadStore:
+    """Spool directory of chunked, resumable uploads.
+
+    Each upload is <token>.part (the bytes received so far) plus
+    <token>.json (file name, total length and owner). A chunk is appended
+    only at the offset already on disk, so after a disconnect the client
+    asks for the offset and carries on from there. Completed uploads are
+    claimed by token; uploads untouched for ttl seconds are removed.
+    """
+
+    def __init__(self, directory, chunk_size=1024 * 1024, max_size=50 * 1024 * 1024, ttl=24 * 60 * 60):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, token):
+        if not UPLOAD_TOKEN_RE.fullmatch(token or ''):
+            raise UploadError('Upload not found', 404)
+        base = os.path.join(self.directory, token)
+        return base + '.part', base + '.json'
+
+    def create(self, filename, length, owner_id, mime_type=None):
+        """Start an upload of length bytes and return its token."""
+        if length < 0 or length > self.max_size:
+            raise UploadError(f"Uploads are limited to {self.max_size} bytes", 413)
+        self.expire()
+
+        token = secrets.token_urlsafe(24)
+        part_path, meta_path = self._paths(token)
+        open(part_path, 'wb').close()
+        with open(meta_path, 'w') as f:
+            json.dump({
+                'filename': filename,
+                'length': length,
+                'mime_type': mime_type,
+                'owner_id': owner_id,
+                'created': time.time(),
+            }, f)
+        return token
+
+    def info(self, token, owner_id):
+        """Return the upload's metadata with its current offset."""
+        part_path, meta_path = self._paths(token)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            meta['offset'] = os.path.getsize(part_path)
+        except (OSError, ValueError):
+            raise UploadError('Upload not found', 404)
+        if meta['owner_id'] != owner_id:
+            raise UploadError('Upload not found', 404)
+        meta['token'] = token
+        meta['complete'] = meta['offset'] == meta['length']
+        return meta
+
+    def append(self, token, owner_id, offset, stream, length):
+        """Write a chunk of length bytes from stream at offset.
+
+        Returns the new offset. Bytes read before a client disconnect stay
+        on disk, so the next chunk starts where this one broke off.
+        """
+        meta = self.info(token, owner_id)
+        if length > self.chunk_size:
+            raise UploadError(f"Chunks are limited to {self.chunk_size} bytes", 413)
+        if offset + length > meta['length']:
+            raise UploadError('Chunk goes past the end of the upload')
+
+        part_path, _ = self._paths(token)
+        with open(part_path, 'r+b') as f:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise UploadError('Another chunk of this upload is being written', 423)
+            current = os.fstat(f.fileno()).st_size
+            if offset != current:
+                raise UploadError(f"Upload-Offset {offset} does not match {current}", 409)
+
+            f.seek(offset)
+            remaining = length
+            while remaining:
+                block = stream.read(min(COPY_BUFFER_SIZE, remaining))
+                if not block:
+                    break
+                f.write(block)
+                remaining -= len(block)
+            return f.tell()
+
+    def claim(self, token, owner_id):
+        """Return (path, metadata) of a completed upload."""
+        meta = self.info(token, owner_id)
+        if not meta['complete']:
+            raise UploadError(f"Upload of {meta['filename']} is not complete", 409)
+        part_path, _ = self._paths(token)
+        return part_path, meta
+
+    def discard(self, token):
+        for path in self._paths(token):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def expire(self):
+        """Remove uploads that haven't received a chunk for ttl seconds."""
+        with self._lock:
+            now = time.time()
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.part') and now - entry.stat().st_mtime > self.ttl:
+                    self.discard(entry.name[:-5])
@@ -11,10 +11,6 @@ os.environ['FLASK_SECRET_KEY'] = 'your-secret-key-here'  # Replace with your sec
 os.environ['GOOGLE_DRIVE_CREDENTIALS_FILE'] = '/home/yourusername/GSEApp/credentials.json'  # Replace with your username
 os.environ['GOOGLE_DRIVE_TOKEN_FILE'] = '/home/yourusername/GSEApp/token.json'  # Replace with your username
 
-# Import your Flask app
+# Import your Flask app; create or migrate the database with
+# `flask setup-db` in a console before reloading
 from app import app as application
-
-# Initialize the database
-with application.app_context():
-    from app import db
-    db.create_all() 
\ No newline at end of file